@@ -0,0 +1,60 @@
+from functools import lru_cache
+
+from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz as rapid_fuzz
+from rapidfuzz import process
+
+from address_normalize import canonical_key_from_parts, canonical_key_from_text
+
+MATCH_THRESHOLD = 90
+
+
+class AddressMatcher:
+    """Scores candidate addresses against one source address with the same accept rule as
+    fuzz.partial_ratio(candidate.lower(), source.lower()) >= 90, using rapidfuzz to reject most candidates in C."""
+
+    def __init__(self, source_address, threshold=MATCH_THRESHOLD) -> None:
+        self.source_address = source_address
+        self.source = source_address.lower()
+        self.threshold = threshold
+        # rapidfuzz's partial_ratio scores the best alignment and fuzzywuzzy's a heuristic subset of
+        # alignments, so the rapidfuzz score is never lower: below this cutoff is a certain reject.
+        # The 1 point margin covers fuzzywuzzy rounding its score to an int.
+        self.cutoff = threshold - 1
+        self.key = canonical_key_from_text(source_address)
+
+    def exact_match(self, address_parts):
+        """Index of the first candidate whose canonical city/state/ZIP5 key equals the source's, or None."""
+        if self.key is None:
+            return None
+        for index, parts in enumerate(address_parts):
+            if canonical_key_from_parts(parts) == self.key:
+                return index
+        return None
+
+    def scores(self, candidates):
+        """Prefilter scores for every candidate in one call; 0 means certainly below threshold."""
+        if not candidates:
+            return []
+        lowered = [candidate.lower() for candidate in candidates]
+        matrix = process.cdist([self.source], lowered, scorer=rapid_fuzz.partial_ratio, score_cutoff=self.cutoff)
+        return [float(score) for score in matrix[0]]
+
+    def accepts(self, candidate):
+        lowered = candidate.lower()
+        if rapid_fuzz.partial_ratio(self.source, lowered, score_cutoff=self.cutoff) == 0:
+            return False
+        return fuzz.partial_ratio(lowered, self.source) >= self.threshold
+
+    def first_match(self, candidates):
+        """Index of the first accepted candidate, or None. Candidates are prefiltered in one batch
+        call and only survivors are confirmed, stopping at the first accepted one."""
+        for index, score in enumerate(self.scores(candidates)):
+            if score and fuzz.partial_ratio(candidates[index].lower(), self.source) >= self.threshold:
+                return index
+        return None
+
+
+@lru_cache(maxsize=1024)
+def matcher_for(source_address):
+    return AddressMatcher(source_address)
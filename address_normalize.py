@@ -0,0 +1,86 @@
+import hashlib
+import re
+
+STATE_ABBREVIATIONS = {
+    "ALABAMA": "AL", "ALASKA": "AK", "ARIZONA": "AZ", "ARKANSAS": "AR", "CALIFORNIA": "CA",
+    "COLORADO": "CO", "CONNECTICUT": "CT", "DELAWARE": "DE", "DISTRICT OF COLUMBIA": "DC",
+    "FLORIDA": "FL", "GEORGIA": "GA", "HAWAII": "HI", "IDAHO": "ID", "ILLINOIS": "IL",
+    "INDIANA": "IN", "IOWA": "IA", "KANSAS": "KS", "KENTUCKY": "KY", "LOUISIANA": "LA",
+    "MAINE": "ME", "MARYLAND": "MD", "MASSACHUSETTS": "MA", "MICHIGAN": "MI", "MINNESOTA": "MN",
+    "MISSISSIPPI": "MS", "MISSOURI": "MO", "MONTANA": "MT", "NEBRASKA": "NE", "NEVADA": "NV",
+    "NEW HAMPSHIRE": "NH", "NEW JERSEY": "NJ", "NEW MEXICO": "NM", "NEW YORK": "NY",
+    "NORTH CAROLINA": "NC", "NORTH DAKOTA": "ND", "OHIO": "OH", "OKLAHOMA": "OK", "OREGON": "OR",
+    "PENNSYLVANIA": "PA", "RHODE ISLAND": "RI", "SOUTH CAROLINA": "SC", "SOUTH DAKOTA": "SD",
+    "TENNESSEE": "TN", "TEXAS": "TX", "UTAH": "UT", "VERMONT": "VT", "VIRGINIA": "VA",
+    "WASHINGTON": "WA", "WEST VIRGINIA": "WV", "WISCONSIN": "WI", "WYOMING": "WY",
+    "PUERTO RICO": "PR", "GUAM": "GU", "VIRGIN ISLANDS": "VI", "AMERICAN SAMOA": "AS",
+    "NORTHERN MARIANA ISLANDS": "MP",
+}
+
+# USPS Publication 28 street suffixes and directionals, plus the city-name words USPS shortens
+WORD_ABBREVIATIONS = {
+    "ALLEY": "ALY", "AVENUE": "AVE", "AV": "AVE", "AVEN": "AVE", "BOULEVARD": "BLVD", "BOUL": "BLVD",
+    "CIRCLE": "CIR", "COURT": "CT", "COVE": "CV", "CREEK": "CRK", "CROSSING": "XING", "DRIVE": "DR",
+    "DRV": "DR", "EXPRESSWAY": "EXPY", "FREEWAY": "FWY", "HEIGHTS": "HTS", "HIGHWAY": "HWY",
+    "HIGHWY": "HWY", "HOLLOW": "HOLW", "JUNCTION": "JCT", "LANE": "LN", "LOOP": "LOOP",
+    "MOUNTAIN": "MTN", "PARKWAY": "PKWY", "PKY": "PKWY", "PLACE": "PL", "PLAZA": "PLZ",
+    "POINT": "PT", "RIDGE": "RDG", "ROAD": "RD", "ROUTE": "RTE", "SQUARE": "SQ", "STREET": "ST",
+    "STR": "ST", "TERRACE": "TER", "TRAIL": "TRL", "TURNPIKE": "TPKE", "VALLEY": "VLY", "VIEW": "VW",
+    "VILLAGE": "VLG", "WAY": "WAY",
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW",
+    "APARTMENT": "APT", "SUITE": "STE", "UNIT": "UNIT", "BUILDING": "BLDG", "FLOOR": "FL",
+    "SAINT": "ST", "FORT": "FT", "MOUNT": "MT",
+}
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+WHITESPACE = re.compile(r"\s+")
+ZIP_PATTERN = re.compile(r"(?<!\d)(\d{5})(?:-?\d{4})?(?!\d)")
+
+
+def normalize_text(text):
+    words = WHITESPACE.sub(" ", PUNCTUATION.sub(" ", str(text).upper())).strip().split(" ")
+    return " ".join(WORD_ABBREVIATIONS.get(word, word) for word in words if word)
+
+
+def normalize_state(state):
+    state = WHITESPACE.sub(" ", PUNCTUATION.sub(" ", str(state).upper())).strip()
+    return STATE_ABBREVIATIONS.get(state, state)
+
+
+def zip5(value):
+    """ZIP5 from a ZIP, ZIP+4 or a number that lost its leading zeros in Excel. None if there is none."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    match = ZIP_PATTERN.search(text)
+    if match:
+        return match.group(1)
+    digits = text.split(".")[0]
+    if digits.isdigit() and len(digits) <= 5:
+        return digits.zfill(5)
+    return None
+
+
+def canonical_key(city, state, zip):
+    zip = zip5(zip)
+    if not zip:
+        return None
+    canonical = f"{normalize_text(city)}|{normalize_state(state)}|{zip}"
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def canonical_key_from_text(address):
+    """Key for a "CITY ST ZIP" string, the shape process_row builds the source address in."""
+    words = str(address).split()
+    if len(words) < 3:
+        return None
+    return canonical_key(" ".join(words[:-2]), words[-2], words[-1])
+
+
+def canonical_key_from_parts(parts):
+    """Key for address span texts ending in city, state, ZIP (street and unit parts come first)."""
+    for index in range(len(parts) - 1, 1, -1):
+        if ZIP_PATTERN.search(parts[index]):
+            return canonical_key(parts[index - 2], parts[index - 1], parts[index])
+    return None
@@ -0,0 +1,97 @@
+import logging
+from collections import Counter
+
+from input_reader import SourceReader
+from metrics import metrics
+from result_sink import JsonlResultSink, journal_path_for
+from run_journal import RowKeys, RunJournal, row_status, run_journal_path_for
+from scheduler import RowScheduler
+import scraper
+
+
+def read_source(source_file, header=True, start=0, stop=None):
+    return SourceReader(source_file, header=header, start=start, stop=stop)
+
+
+def plan_lookups(source, run_journal: RunJournal, retry_errors=True):
+    """One streaming pass over source that counts its rows and how many pending rows share each
+    person and ZIP lookup, so the coalescers know when a result can be let go."""
+    total_rows = 0
+    row_keys = RowKeys()
+    people = Counter()
+    for _, row in source:
+        total_rows += 1
+        if run_journal.should_run(row_keys.key(row), retry_errors):
+            people[scraper.person_key(row)] += 1
+    # Only the first row of each person resolves its ZIP
+    zips = Counter(zip_key for _, _, zip_key in people)
+    return total_rows, people, zips
+
+
+def run_batch(source, dest_file, log: logging, workers=4, retry_errors=True, on_progress=None):
+    """Scrapes every (index, row) of source that the destination's run journal has not finished yet
+    and appends the results to the destination's result journal. Rows are pulled from source only as
+    workers free up. Returns the sink; exporting is left to the caller."""
+    sink = JsonlResultSink(journal_path_for(dest_file))
+    run_journal = RunJournal(run_journal_path_for(dest_file))
+    total_rows, people, zips = plan_lookups(source, run_journal, retry_errors)
+    log.info(
+        f"Planned {total_rows} rows: {sum(people.values())} to scrape, "
+        f"{len(people)} distinct people, {len(zips)} distinct ZIPs"
+    )
+    scraper.person_searches.expect(people)
+    scraper.zip_lookups.expect(zips)
+    row_keys = RowKeys()
+    keys = {}
+    finished = 0
+    skipped = 0
+    if on_progress:
+        on_progress(finished, total_rows)
+
+    def pending():
+        nonlocal finished, skipped
+        for index, row in source:
+            key = row_keys.key(row)
+            if run_journal.should_run(key, retry_errors):
+                keys[index] = key
+                yield index, row
+            else:
+                finished += 1
+                skipped += 1
+
+    def on_result(index, row, rows):
+        nonlocal finished
+        key = keys.pop(index)
+        status = row_status(rows)
+        with metrics.timer("output_write"):
+            sink.write(rows, key)
+            run_journal.mark(key, status)
+        metrics.count("rows_finished")
+        if status == "ERROR":
+            metrics.count("rows_error")
+        finished += 1
+        if on_progress:
+            on_progress(finished, total_rows)
+
+    log.info(f"Processing with {workers} parallel workers")
+    try:
+        RowScheduler(max_workers=workers).run(pending(), scraper.scrape_row, on_result, log)
+    finally:
+        run_journal.close()
+        scraper.person_searches.clear()
+        scraper.zip_lookups.clear()
+    if skipped:
+        log.info(f"Resumed run: skipped {skipped} rows already finished {run_journal.counts()}")
+    if on_progress and skipped:
+        on_progress(finished, total_rows)
+    return sink
+
+
+def run_stats():
+    return {
+        "response_cache": scraper.response_cache.stats(),
+        "proxy": scraper.proxy_governor.utilization(),
+        "fetch_strategy": scraper.fetch_strategy.stats(),
+        "coalescing": {"people": scraper.person_searches.stats(), "zips": scraper.zip_lookups.stats()},
+        "metrics": metrics.snapshot(),
+    }
@@ -0,0 +1,209 @@
+"""Offline benchmark: scrapes synthetic workbooks against the local stand-in and reports rows/sec,
+peak RSS and time per stage. Nothing leaves the machine and no credits are spent.
+
+    python bench/run_bench.py --rows 1000 10000 --workers 8 --latency-ms 150 --out bench.json
+    python bench/run_bench.py --rows 1000 --entry process_row --rate-429 0.01 --error-rate 0.02
+
+Every size runs in its own work directory under --workdir with fresh caches, so results do not
+depend on earlier runs unless --keep-caches is given. peak_rss_mb is the size's own peak where
+the kernel lets it be reset (peak_rss_scope "size"), otherwise the process's peak so far.
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import sys
+import time
+
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper
+from batch import read_source, run_batch, run_stats
+from cli import add_runtime_options, configure, get_logger
+from metrics import metrics
+from profiling import profiler
+from result_sink import JsonlResultSink, journal_path_for
+from stand_in import add_stand_in_options, cities_for, config_from_args, start_stand_in
+
+FIRST_NAMES = ["JOHN", "MARY", "JAMES", "PATRICIA", "ROBERT", "JENNIFER", "MICHAEL", "LINDA", "DAVID", "SUSAN"]
+LAST_NAMES = ["SMITH", "JOHNSON", "WILLIAMS", "BROWN", "JONES", "GARCIA", "MILLER", "DAVIS", "WILSON", "MOORE"]
+
+
+def synthetic_zip(index, zip_count):
+    return 10000 + index % zip_count
+
+
+def write_workbook(path, rows, zip_count, duplicate_every):
+    """Header plus `rows` input rows; every duplicate_every-th row repeats an earlier person."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP"])
+    for index in range(rows):
+        person = index - 1 if duplicate_every and index and index % duplicate_every == 0 else index
+        zip = synthetic_zip(person, zip_count)
+        city, state = cities_for(zip)[0].rsplit(" ", 1)
+        sheet.append([
+            f"{FIRST_NAMES[person % len(FIRST_NAMES)]}{person}",
+            LAST_NAMES[person // len(FIRST_NAMES) % len(LAST_NAMES)],
+            f"{index} MAIN ST",
+            city,
+            state,
+            zip,
+        ])
+    workbook.save(path)
+
+
+def write_zip_dataset(path, zip_count):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["zip", "city", "state", "acceptable_cities"])
+        for index in range(zip_count):
+            zip = synthetic_zip(index, zip_count)
+            cities = cities_for(zip)
+            city, state = cities[0].rsplit(" ", 1)
+            writer.writerow([zip, city, state, ",".join(other.rsplit(" ", 1)[0] for other in cities[1:])])
+
+
+def reset_peak_rss():
+    """Restarts the process's peak RSS (VmHWM) count; Linux only, False where it is not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss (KB on Linux) is the peak since the process started and cannot be reset
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def coalescing_since(before, after):
+    # runs and coalesced count up for the whole process; held is a current size
+    return {key: value if key == "held" else value - before.get(key, 0) for key, value in after.items()}
+
+
+def run_size(args, rows, stand_in_url, stand_in_config, log):
+    workdir = os.path.join(args.workdir, f"{args.entry}-{rows}")
+    os.makedirs(workdir, exist_ok=True)
+    source_file = os.path.join(workdir, "source.xlsx")
+    dest_file = os.path.join(workdir, "result.xlsx")
+    zip_count = args.zip_count or max(1, rows // 20)
+    if not os.path.exists(source_file):
+        write_workbook(source_file, rows, zip_count, args.duplicate_every)
+    for name in os.listdir(workdir):
+        if name.startswith("result.") or (not args.keep_caches and ".sqlite" in name):
+            os.remove(os.path.join(workdir, name))
+
+    if args.usps:
+        args.zip_dataset = os.path.join(workdir, "no_dataset.csv")
+    else:
+        args.zip_dataset = os.path.join(workdir, "zip_cities.csv")
+        write_zip_dataset(args.zip_dataset, zip_count)
+    args.zip_cache = os.path.join(workdir, "zip_cache.sqlite")
+    args.response_cache = os.path.join(workdir, "response_cache.sqlite")
+    args.proxy_url = f"{stand_in_url}/v1/"
+    args.usps_url = f"{stand_in_url}/usps"
+    configure(args)
+    metrics.reset()
+    # Coalesced results from an earlier size would let this one skip work
+    scraper.person_searches.clear()
+    scraper.zip_lookups.clear()
+    rss_scope = "size" if reset_peak_rss() else "process"
+    requests_before = stand_in_config.stats()
+    coalescing_before = run_stats()["coalescing"]
+
+    started = time.perf_counter()
+    try:
+        source = read_source(source_file)
+        if args.entry == "batch":
+            sink = run_batch(source, dest_file, log, args.workers, True)
+        else:
+            sink = JsonlResultSink(journal_path_for(dest_file))
+            for _, row in source:
+                scraper.process_row(row, sink, log)
+        scrape_sec = time.perf_counter() - started
+        if not args.no_export:
+            sink.export_excel(dest_file)
+        elapsed = time.perf_counter() - started
+    finally:
+        scraper.driver_pool.close()
+        scraper.proxy_session.close()
+        profile_path = profiler.finish()
+
+    stand_in_stats = stand_in_config.stats()
+    snapshot = metrics.snapshot()
+    return {
+        "entry": args.entry,
+        "rows": rows,
+        "workers": args.workers if args.entry == "batch" else 1,
+        "elapsed_sec": round(elapsed, 3),
+        "scrape_sec": round(scrape_sec, 3),
+        "rows_per_sec": round(rows / scrape_sec, 2) if scrape_sec else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_scope": rss_scope,
+        "stand_in": {key: stand_in_stats[key] - requests_before[key] for key in stand_in_stats},
+        "stages": {stage: summary for stage, summary in snapshot["stages"].items()},
+        "counters": snapshot["counters"],
+        "coalescing": {kind: coalescing_since(coalescing_before[kind], stats)
+                       for kind, stats in run_stats()["coalescing"].items()},
+        "profile": profile_path,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline scraper benchmark against a local stand-in")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000], help="Workbook sizes to run, e.g. 1000 10000 100000")
+    parser.add_argument("--entry", choices=["batch", "process_row"], default="batch",
+                        help="batch: run_batch over the worker pool; process_row: the plain per-row loop")
+    parser.add_argument("--workdir", default="bench_runs")
+    parser.add_argument("--zip-count", type=int, default=None, help="Distinct ZIPs (default rows / 20)")
+    parser.add_argument("--duplicate-every", type=int, default=10,
+                        help="Every Nth row repeats the previous person (0 for none)")
+    parser.add_argument("--usps", action="store_true",
+                        help="Skip the local ZIP dataset so lookups go through Selenium and the stand-in USPS page")
+    parser.add_argument("--keep-caches", action="store_true")
+    parser.add_argument("--no-export", action="store_true", help="Skip the final .xlsx export")
+    parser.add_argument("--port", type=int, default=0, help="Stand-in port (0 picks a free one)")
+    parser.add_argument("--out", default=None, help="Also write the results as JSON here")
+    add_stand_in_options(parser)
+    add_runtime_options(parser)
+    # The stand-in is local: do not let the production rate limit be what gets measured
+    parser.set_defaults(rps=1000.0, max_in_flight=64, workers=8, log_level="INFO", no_response_cache=True)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    stand_in_config = config_from_args(args)
+    server = start_stand_in(stand_in_config, args.port)
+    stand_in_url = f"http://127.0.0.1:{server.server_port}"
+    os.makedirs(args.workdir, exist_ok=True)
+    log = get_logger(os.path.join(args.workdir, "bench.log"), args.log_level, args.log_sample_every)
+    results = []
+    try:
+        for rows in args.rows:
+            result = run_size(args, rows, stand_in_url, stand_in_config, log)
+            results.append(result)
+            print(json.dumps(result), flush=True)
+    finally:
+        server.shutdown()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
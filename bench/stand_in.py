@@ -0,0 +1,226 @@
+"""Local stand-in for the ScrapeOps proxy, Truepeoplesearch and the USPS city lookup.
+
+Answers GET /v1/?api_key=...&url=<truepeoplesearch url>&render_js=... with synthetic result and
+detail pages in the markup tps_extract reads, and GET /usps with a page that drives the same
+form the Selenium lookup fills in. Latency, 5xx, 429 and blocked-page rates are configurable so
+runs exercise the retry, rate-limit and render_js paths without spending credits.
+
+    python bench/stand_in.py --port 8899 --latency-ms 300 --error-rate 0.02 --rate-429 0.01
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATES = ["CA", "NY", "TX", "FL", "IL", "WA", "PA", "OH", "GA", "NC"]
+# Real pages are tens of KB; the padding keeps parse work and looks_blocked() honest
+PADDING = "<!-- " + "x" * 4000 + " -->"
+
+USPS_PAGE = """<html><body>
+<input id="tZip" type="text"><a id="cities-by-zip-code" href="#">Find</a>
+<div class="recommended-cities" style="display:none"></div><div class="other-city-names"></div>
+<script>
+document.getElementById("cities-by-zip-code").onclick = function () {
+  fetch("/usps/cities?zip=" + encodeURIComponent(document.getElementById("tZip").value))
+    .then(function (r) { return r.json(); })
+    .then(function (cities) {
+      var box = document.querySelector(".recommended-cities");
+      box.innerHTML = cities.map(function (c) { return '<p class="row-detail-wrapper">' + c + "</p>"; }).join("");
+      box.style.display = "block";
+    });
+  return false;
+};
+</script></body></html>"""
+
+
+def stable_int(*parts):
+    return int(hashlib.md5("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:8], 16)
+
+
+def cities_for(zip):
+    """Deterministic "CITY ST" names for a ZIP; the benchmark writes the same ones to its zip dataset."""
+    seed = stable_int(zip)
+    state = STATES[seed % len(STATES)]
+    cities = [f"CITY{seed % 997} {state}"]
+    if seed % 4 == 0:
+        cities.append(f"TOWN{seed % 991} {state}")
+    return cities
+
+
+class StandInConfig:
+    def __init__(self, latency_ms=200, jitter_ms=100, error_rate=0.0, rate_429=0.0, retry_after=1,
+                 blocked_rate=0.0, results_per_search=4, seed=0) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.blocked_rate = blocked_rate
+        self.results_per_search = results_per_search
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "search": 0, "detail": 0, "errors": 0, "throttled": 0, "blocked": 0,
+                         "usps": 0}
+
+    def roll(self):
+        with self.lock:
+            return self.random.random()
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def results_page(query, per_search):
+    name = query.get("name", [""])[0]
+    citystatezip = query.get("citystatezip", [""])[0]
+    # The matching profile sits at a stable but varying position, so fan-out cancellation is exercised
+    match_at = stable_int(name, citystatezip) % per_search
+    cards = "".join(
+        f'<div class="card card-body shadow-form card-summary pt-3" data-detail-link="/find/person/p{index}x'
+        f'?csz={urllib.parse.quote(citystatezip)}&m={int(index == match_at)}"></div>'
+        for index in range(per_search)
+    )
+    return f"<html><body>{PADDING}{cards}</body></html>"
+
+
+def detail_page(query, path):
+    citystatezip = query.get("csz", [""])[0].split(" ")
+    matched = query.get("m", ["0"])[0] == "1"
+    if matched and len(citystatezip) >= 3:
+        city, state, zip = " ".join(citystatezip[:-2]), citystatezip[-2], citystatezip[-1]
+    else:
+        city, state, zip = "ELSEWHERE", "ZZ", "00001"
+    person = path.rsplit("/", 1)[-1]
+    return (
+        f"<html><body>{PADDING}"
+        f'<a data-link-to-more="address" href="#"><span>1 Main St</span><span>{city}</span>'
+        f"<span>{state}</span><span>{zip}</span></a>"
+        f'<div class="row pl-md-1"><div class="col">Email Addresses</div>'
+        f'<div class="col">{person}.{zip}@gmail.com</div><div class="col">{person}@yahoo.com</div></div>'
+        f"</body></html>"
+    )
+
+
+def make_handler(config: StandInConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send(self, status, body, content_type="text/html", headers=None):
+            body = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = urllib.parse.urlsplit(self.path)
+            query = urllib.parse.parse_qs(parts.query)
+            if parts.path == "/usps":
+                config.count("usps")
+                return self.send(200, USPS_PAGE)
+            if parts.path == "/usps/cities":
+                return self.send(200, json.dumps(cities_for(query.get("zip", [""])[0])), "application/json")
+            if parts.path.rstrip("/") != "/v1":
+                return self.send(404, "not found")
+            config.count("requests")
+            time.sleep(max(0.0, config.latency_ms + config.roll() * 2 * config.jitter_ms - config.jitter_ms) / 1000)
+            roll = config.roll()
+            if roll < config.rate_429:
+                config.count("throttled")
+                return self.send(429, "Too Many Requests", headers={"Retry-After": str(config.retry_after)})
+            if roll < config.rate_429 + config.error_rate:
+                config.count("errors")
+                return self.send(500, "Internal Server Error")
+            target = urllib.parse.urlsplit(query.get("url", [""])[0])
+            render_js = query.get("render_js", ["False"])[0].lower() == "true"
+            if not render_js and config.roll() < config.blocked_rate:
+                config.count("blocked")
+                return self.send(200, "<html><body>Just a moment...</body></html>")
+            target_query = urllib.parse.parse_qs(target.query)
+            if target.path.startswith("/results"):
+                config.count("search")
+                return self.send(200, results_page(target_query, config.results_per_search))
+            config.count("detail")
+            return self.send(200, detail_page(target_query, target.path))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def process_request(self, request, client_address):
+        # Named so the sampling profiler can tell the stand-in's threads from the scraper's
+        thread = threading.Thread(target=self.process_request_thread, args=(request, client_address),
+                                  name="stand-in-request", daemon=True)
+        thread.start()
+
+    def handle_error(self, request, client_address):
+        # The scraper cancels the remaining detail fetches once one matches, dropping their connections
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_stand_in(config: StandInConfig, port=0, host="127.0.0.1"):
+    """Starts the server on a daemon thread; port 0 picks a free one (see server.server_port)."""
+    server = StandInServer((host, port), make_handler(config))
+    threading.Thread(target=server.serve_forever, name="stand-in", daemon=True).start()
+    return server
+
+
+def add_stand_in_options(parser):
+    parser.add_argument("--latency-ms", type=float, default=200, help="Mean proxy response latency")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Uniform +/- latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of proxy requests answered with 500")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of proxy requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--blocked-rate", type=float, default=0.0,
+                        help="Share of plain (non render_js) pages that come back as a challenge page")
+    parser.add_argument("--results-per-search", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args):
+    return StandInConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        blocked_rate=args.blocked_rate,
+        results_per_search=args.results_per_search,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local ScrapeOps/Truepeoplesearch/USPS stand-in")
+    parser.add_argument("--port", type=int, default=8899)
+    add_stand_in_options(parser)
+    args = parser.parse_args()
+    config = config_from_args(args)
+    server = start_stand_in(config, args.port)
+    print(f"Proxy: http://127.0.0.1:{server.server_port}/v1/  USPS: http://127.0.0.1:{server.server_port}/usps")
+    try:
+        while True:
+            time.sleep(10)
+            print(json.dumps(config.stats()), flush=True)
+    except KeyboardInterrupt:
+        server.shutdown()
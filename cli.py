@@ -0,0 +1,165 @@
+import argparse
+import json
+import logging
+import sys
+import time
+import traceback
+
+import scraper
+from batch import read_source, run_batch, run_stats
+from driver_pool import DriverPool
+from http_session import ProxySession
+from log_pipeline import start_logging
+from metrics import metrics
+from profiling import profiler
+from response_cache import ResponseCache
+from zip_cache import ZipCityCache
+from zip_resolver import DEFAULT_DATASET, default_resolvers
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Truepeoplesearch scraper without the GUI")
+    parser.add_argument("source", help="Source .xlsx/.csv/.parquet file (FIRST_NAME, LAST_NAME, STREET, CITY, DIST, ZIP)")
+    parser.add_argument("dest", help="Destination Excel file; its .jsonl/.run.sqlite journals sit next to it")
+    parser.add_argument("--no-header", action="store_true", help="The source sheet has no header row")
+    parser.add_argument("--no-export", action="store_true", help="Only append to the result journal, skip the .xlsx")
+    add_runtime_options(parser)
+    return parser
+
+
+def add_runtime_options(parser):
+    parser.add_argument("--workers", type=int, default=4, help="Rows scraped in parallel")
+    parser.add_argument("--no-retry-errors", action="store_true", help="Do not rerun rows that ended in ERROR")
+    parser.add_argument("--zip-dataset", default=DEFAULT_DATASET,
+                        help="Local zip/city/state CSV for offline ZIP lookups (default: next to the scraper)")
+    parser.add_argument("--zip-cache", default="zip_cache.sqlite", help="ZIP -> city cache file")
+    parser.add_argument("--zip-cache-ttl", type=float, default=30 * 24 * 3600, help="ZIP cache TTL in seconds")
+    parser.add_argument("--response-cache", default="response_cache.sqlite", help="Page cache file")
+    parser.add_argument("--response-cache-ttl", type=float, default=7 * 24 * 3600, help="Page cache TTL in seconds")
+    parser.add_argument("--response-cache-mb", type=float, default=500, help="Page cache size bound in MB")
+    parser.add_argument("--no-response-cache", action="store_true", help="Always fetch pages from the proxy")
+    parser.add_argument("--proxy-url", default=scraper.PROXY_URL, help="ScrapeOps-compatible proxy endpoint")
+    parser.add_argument("--usps-url", default=scraper.USPS_URL, help="USPS city-by-ZIP lookup page")
+    parser.add_argument("--browsers", type=int, default=2, help="Headless Chrome instances kept for USPS lookups")
+    parser.add_argument("--http-pool-size", type=int, default=20, help="Keep-alive connections to the proxy")
+    parser.add_argument("--rps", type=float, default=5.0, help="Proxy requests per second")
+    parser.add_argument("--max-in-flight", type=int, default=10, help="Proxy requests in flight")
+    parser.add_argument("--credit-budget", type=int, default=None, help="ScrapeOps credits this run may spend")
+    parser.add_argument("--on-low-budget", choices=["search_only", "pause"], default="search_only")
+    parser.add_argument("--low-budget-pause-sec", type=float, default=300,
+                        help="With --on-low-budget pause, fail a held request after this many seconds")
+    parser.add_argument("--progress", choices=["json", "text", "none"], default="json",
+                        help="Progress lines printed to stdout")
+    parser.add_argument("--log-file", default="logs.log")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Write stage timings and counters here (.json, otherwise Prometheus text)")
+    parser.add_argument("--metrics-interval", type=float, default=10, help="Seconds between metrics file writes")
+    parser.add_argument("--profile", choices=["cprofile", "sampling"], default=None,
+                        help="Profile a window of rows and write the results under --profile-dir/<run id>")
+    parser.add_argument("--profile-rows", type=int, default=200, help="Rows in the profiling window")
+    parser.add_argument("--profile-skip", type=int, default=0, help="Rows to let pass before the window opens")
+    parser.add_argument("--profile-interval", type=float, default=0.005, help="Sampling profiler interval in seconds")
+    parser.add_argument("--profile-dir", default="profiles")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Do not track allocations while profiling")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve /metrics and /metrics.json on this local port")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="DEBUG")
+    parser.add_argument("--log-sample-every", type=int, default=10,
+                        help="Keep one in this many DEBUG lines from each call site")
+
+
+def configure(args):
+    scraper.PROXY_URL = args.proxy_url
+    scraper.USPS_URL = args.usps_url
+    scraper.zip_resolvers = default_resolvers(args.zip_dataset)
+    scraper.zip_cache = ZipCityCache(args.zip_cache, ttl_sec=args.zip_cache_ttl)
+    scraper.response_cache = ResponseCache(
+        args.response_cache,
+        ttl_sec=args.response_cache_ttl,
+        max_bytes=int(args.response_cache_mb * 1024 * 1024),
+        enabled=not args.no_response_cache,
+    )
+    scraper.driver_pool = DriverPool(size=args.browsers)
+    scraper.proxy_session = ProxySession(pool_size=args.http_pool_size)
+    scraper.proxy_governor.configure(
+        requests_per_sec=args.rps,
+        max_in_flight=args.max_in_flight,
+        credit_budget=args.credit_budget,
+        on_low_budget=args.on_low_budget,
+        pause_sec=args.low_budget_pause_sec,
+    )
+    profiler.configure(
+        args.profile,
+        rows=args.profile_rows,
+        skip=args.profile_skip,
+        out_dir=args.profile_dir,
+        interval=args.profile_interval,
+        trace_allocations=not args.no_tracemalloc,
+    )
+    if args.metrics_file:
+        metrics.write_every(args.metrics_file, args.metrics_interval)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+
+def get_logger(log_file, level="DEBUG", sample_every=10):
+    return start_logging("ExcelProcessor", log_file, level=getattr(logging, level), sample_every=sample_every).logger
+
+
+class ProgressPrinter:
+    def __init__(self, mode) -> None:
+        self.mode = mode
+        self.started = time.monotonic()
+        self.first_finished = None
+
+    def emit(self, event, **fields):
+        if self.mode == "json":
+            print(json.dumps(dict(event=event, time=round(time.time(), 3), **fields), default=str), flush=True)
+        elif self.mode == "text":
+            print(f"{event}: " + " ".join(f"{key}={value}" for key, value in fields.items()), flush=True)
+
+    def __call__(self, finished, total_rows):
+        if self.first_finished is None:
+            self.first_finished = finished
+        elapsed = time.monotonic() - self.started
+        done_now = finished - self.first_finished
+        self.emit(
+            "progress",
+            finished=finished,
+            total=total_rows,
+            percent=round(finished / total_rows * 100, 2) if total_rows else 100.0,
+            rows_per_min=round(done_now / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        )
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    log = get_logger(args.log_file, args.log_level, args.log_sample_every)
+    configure(args)
+    progress = ProgressPrinter(args.progress)
+    progress.emit("start", source=args.source, dest=args.dest, workers=args.workers)
+    try:
+        source = read_source(args.source, header=not args.no_header)
+        sink = run_batch(source, args.dest, log, args.workers, not args.no_retry_errors, progress)
+        if not args.no_export:
+            sink.export_excel(args.dest)
+            log.info(f"Saved to excel: {args.dest}")
+        progress.emit("done", dest=args.dest, journal=sink.path, stats=run_stats())
+        return 0
+    except Exception as e:
+        log.error(traceback.format_exc())
+        progress.emit("error", message=str(e))
+        return 1
+    finally:
+        scraper.driver_pool.close()
+        scraper.proxy_session.close()
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
+        profile_path = profiler.finish()
+        if profile_path:
+            log.info(f"Profile written to {profile_path}")
+            progress.emit("profile", path=profile_path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+
+class Coalescer:
+    """Runs the work for each distinct key once, however many threads ask for it.
+
+    A caller that asks for a key whose work is still running waits on that result instead of
+    starting its own. With a plan from expect(), a finished result is kept until the planned
+    number of callers have taken it; without one, only callers that overlap the running work
+    share it, and the result is dropped as soon as it is ready. A failure is
+    handed to the callers already waiting and then forgotten, so a later caller tries again.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.expected = None
+        self.counters = {"runs": 0, "coalesced": 0}
+
+    def expect(self, counts):
+        with self.lock:
+            self.expected = Counter(counts)
+
+    def clear(self):
+        with self.lock:
+            self.futures.clear()
+            self.expected = None
+
+    def released(self, key):
+        return self.expected is None or self.expected[key] <= 0
+
+    def run(self, key, work, *args):
+        with self.lock:
+            future = self.futures.get(key)
+            owner = future is None
+            if owner:
+                future = self.futures[key] = Future()
+                self.counters["runs"] += 1
+            else:
+                self.counters["coalesced"] += 1
+            if self.expected is not None:
+                self.expected[key] -= 1
+                if not owner and future.done() and self.released(key):
+                    del self.futures[key]
+        if not owner:
+            return future.result()
+
+        try:
+            result = work(*args)
+        except BaseException as e:
+            with self.lock:
+                self.futures.pop(key, None)
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        with self.lock:
+            if self.released(key) and self.futures.get(key) is future:
+                del self.futures[key]
+        return result
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["held"] = len(self.futures)
+        return stats
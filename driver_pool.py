@@ -0,0 +1,105 @@
+import atexit
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+log = logging.getLogger(__name__)
+
+
+def create_driver():
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")  # Disable GPU acceleration (useful for headless mode)
+    chrome_options.add_argument("--no-sandbox")  # Bypass OS security model (useful for Docker)
+    chrome_options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
+    chrome_options.add_argument("blink-settings=imagesEnabled=false")
+    return webdriver.Chrome(options=chrome_options)
+
+
+class PooledDriver:
+    def __init__(self, driver) -> None:
+        self.driver = driver
+        self.uses = 0
+
+
+class DriverPool:
+    """Bounded pool of warm headless Chrome instances.
+
+    Drivers are started lazily, recycled after max_uses checkouts or when a checkout raises or
+    fails the health check. close() quits every driver (it also runs at exit); the pool restarts lazily if used again.
+    """
+
+    def __init__(self, size=2, max_uses=50, factory=create_driver) -> None:
+        self.size = size
+        self.max_uses = max_uses
+        self.factory = factory
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.live = set()
+        atexit.register(self.close)
+
+    def healthy(self, pooled: PooledDriver):
+        try:
+            pooled.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def discard(self, pooled: PooledDriver):
+        with self.lock:
+            self.live.discard(pooled)
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            log.warning(f"Quitting a recycled driver failed: {e}")
+
+    def checkout(self):
+        while True:
+            try:
+                pooled = self.idle.get_nowait()
+            except queue.Empty:
+                pooled = PooledDriver(self.factory())
+                with self.lock:
+                    self.live.add(pooled)
+                return pooled
+            if self.healthy(pooled):
+                return pooled
+            self.discard(pooled)
+
+    def checkin(self, pooled: PooledDriver, failed):
+        pooled.uses += 1
+        if pooled.uses >= self.max_uses or (failed and not self.healthy(pooled)):
+            self.discard(pooled)
+        else:
+            self.idle.put(pooled)
+
+    @contextmanager
+    def acquire(self):
+        self.slots.acquire()
+        try:
+            pooled = self.checkout()
+            failed = True
+            try:
+                yield pooled.driver
+                failed = False
+            finally:
+                self.checkin(pooled, failed)
+        finally:
+            self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                pooled = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(pooled)
+        with self.lock:
+            leftovers = list(self.live)
+        for pooled in leftovers:
+            self.discard(pooled)
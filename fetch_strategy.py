@@ -0,0 +1,79 @@
+import re
+import threading
+import urllib.parse
+
+CHALLENGE_MARKERS = ("g-recaptcha", "h-captcha", "px-captcha", "cf-chl", "challenge-form", "Just a moment...", "Access Denied")
+MIN_PAGE_LENGTH = 512
+NUMERIC_SEGMENT = re.compile(r"^[\w-]*\d[\w-]*$")
+
+
+def url_pattern(url):
+    """Groups URLs that render alike: the path with id-like segments collapsed, e.g. /find/person/*."""
+    segments = [segment for segment in urllib.parse.urlsplit(url).path.split("/") if segment]
+    segments = ["*" if NUMERIC_SEGMENT.match(segment) else segment for segment in segments[:3]]
+    return "/" + "/".join(segments)
+
+
+def looks_blocked(html, status_code=200):
+    """True only on positive signs of a challenge: a non-2xx status, a near-empty body or a
+    captcha/challenge marker. A page missing the structure the extractor expects is not enough,
+    as an empty result or a markup change would then buy render_js for every page."""
+    if not 200 <= status_code < 300:
+        return True
+    if not html or len(html.strip()) < MIN_PAGE_LENGTH:
+        return True
+    return any(marker in html for marker in CHALLENGE_MARKERS)
+
+
+class PatternStats:
+    def __init__(self) -> None:
+        self.plain = 0
+        self.plain_blocked = 0
+        self.rendered = 0
+        self.rendered_blocked = 0
+        self.skipped_plain = 0
+
+
+class FetchStrategy:
+    """Cheap request first, render_js only when the page looks empty or blocked.
+
+    Per URL pattern it counts how often the plain request had to be escalated. Once a pattern has
+    min_samples plain fetches and at least prerender_ratio of them were blocked, its URLs go straight
+    to render_js, except every probe_every-th one, which still tries plain so the strategy notices
+    when rendering stops being necessary.
+    """
+
+    def __init__(self, min_samples=10, prerender_ratio=0.8, probe_every=20) -> None:
+        self.min_samples = min_samples
+        self.prerender_ratio = prerender_ratio
+        self.probe_every = probe_every
+        self.lock = threading.Lock()
+        self.patterns = {}
+
+    def stats_for(self, url):
+        pattern = url_pattern(url)
+        if pattern not in self.patterns:
+            self.patterns[pattern] = PatternStats()
+        return self.patterns[pattern]
+
+    def should_prerender(self, url):
+        with self.lock:
+            stats = self.stats_for(url)
+            if stats.plain < self.min_samples or stats.plain_blocked < stats.plain * self.prerender_ratio:
+                return False
+            stats.skipped_plain += 1
+            return stats.skipped_plain % self.probe_every != 0
+
+    def record(self, url, render_js, blocked):
+        with self.lock:
+            stats = self.stats_for(url)
+            if render_js:
+                stats.rendered += 1
+                stats.rendered_blocked += int(blocked)
+            else:
+                stats.plain += 1
+                stats.plain_blocked += int(blocked)
+
+    def stats(self):
+        with self.lock:
+            return {pattern: dict(vars(stats)) for pattern, stats in self.patterns.items()}
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+import httpx
+
+
+class ProxySession:
+    """Keep-alive HTTP client shared by all workers.
+
+    One httpx.AsyncClient lives on a background event loop thread, so coroutines from any worker
+    share a single bounded connection pool. Synchronous callers use run() to execute a coroutine
+    on that loop and wait for its result.
+    """
+
+    def __init__(self, pool_size=20, connect_timeout=10, read_timeout=120) -> None:
+        self.pool_size = pool_size
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.lock = threading.Lock()
+        self.loop = None
+        self.thread = None
+        self.client = None
+
+    def start(self):
+        with self.lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="proxy-session", daemon=True)
+            thread.start()
+            self.loop, self.thread = loop, thread
+            self.client = self.run_on_loop(self.build_client())
+
+    async def build_client(self):
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.AsyncClient(limits=limits, timeout=self.timeout)
+
+    def run_on_loop(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def run(self, coro):
+        self.start()
+        return self.run_on_loop(coro)
+
+    async def get(self, url, params=None, timeout=None):
+        return await self.client.get(url, params=params, timeout=timeout or self.timeout)
+
+    def close(self):
+        with self.lock:
+            if self.loop is None:
+                return
+            self.run_on_loop(self.client.aclose())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.loop, self.thread, self.client = None, None, None
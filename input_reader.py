@@ -0,0 +1,85 @@
+import csv
+import itertools
+import os
+
+import openpyxl
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+INPUT_COLUMNS = ["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP"]
+
+
+def xlsx_values(path):
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for values in workbook.active.iter_rows(values_only=True):
+            yield values
+    finally:
+        workbook.close()
+
+
+def csv_values(path):
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        for values in csv.reader(file):
+            yield [value if value != "" else None for value in values]
+
+
+def parquet_values(path):
+    if pq is None:
+        raise ImportError("Reading .parquet sources needs pyarrow (pip install pyarrow)")
+    parquet_file = pq.ParquetFile(path)
+    yield parquet_file.schema_arrow.names
+    for batch in parquet_file.iter_batches(batch_size=1024):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+READERS = {
+    ".xlsx": xlsx_values,
+    ".xlsm": xlsx_values,
+    ".csv": csv_values,
+    ".parquet": parquet_values,
+}
+
+
+class SourceReader:
+    """Input rows of a source file as plain dicts keyed by INPUT_COLUMNS, read lazily.
+
+    Iterating yields (index, record) where index is the row's position among the data rows, so
+    start/stop select the same rows whatever the file type. Blank rows are skipped. Parquet
+    always has a header (its column names), so header only applies to .xlsx and .csv.
+    """
+
+    def __init__(self, path, header=True, start=0, stop=None) -> None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in READERS:
+            raise ValueError(f"Unsupported source file type: {extension or path}")
+        self.path = path
+        self.values = READERS[extension]
+        self.header = header or extension == ".parquet"
+        self.start = start
+        self.stop = stop
+        self.total_rows = None
+
+    def records(self):
+        values = self.values(self.path)
+        if self.header:
+            next(values, None)
+        width = len(INPUT_COLUMNS)
+        for row in values:
+            row = tuple(row[:width])
+            if all(value is None for value in row):
+                continue
+            yield dict(zip(INPUT_COLUMNS, row + (None,) * (width - len(row))))
+
+    def __iter__(self):
+        return itertools.islice(enumerate(self.records()), self.start, self.stop)
+
+    def __len__(self):
+        if self.total_rows is None:
+            # One streaming pass; only the count is kept
+            self.total_rows = sum(1 for _ in self)
+        return self.total_rows
+
@@ -0,0 +1,140 @@
+import atexit
+import logging
+import queue
+import threading
+from collections import defaultdict, deque
+from logging.handlers import QueueHandler
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class BatchedFileHandler(logging.FileHandler):
+    """FileHandler that writes formatted records in batches of batch_size. ERROR and above are
+    written at once, and whatever is buffered goes out on flush()."""
+
+    def __init__(self, filename, batch_size=200, encoding="utf-8") -> None:
+        super().__init__(filename, encoding=encoding, delay=True)
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def emit(self, record):
+        try:
+            self.buffer.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self.buffer) >= self.batch_size or record.levelno >= logging.ERROR:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.buffer:
+                return
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write("\n".join(self.buffer) + "\n")
+            self.stream.flush()
+            self.buffer = []
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class SamplingFilter(logging.Filter):
+    """Passes every record at or above min_level, and one in every `every` records below it from
+    each call site, so a per-row or per-page debug line cannot flood the log."""
+
+    def __init__(self, every=10, min_level=logging.INFO) -> None:
+        super().__init__()
+        self.every = max(1, int(every))
+        self.min_level = min_level
+        self.lock = threading.Lock()
+        self.seen = defaultdict(int)
+
+    def filter(self, record):
+        if record.levelno >= self.min_level:
+            return True
+        key = (record.pathname, record.lineno)
+        with self.lock:
+            count = self.seen[key]
+            self.seen[key] = count + 1
+        return count % self.every == 0
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the newest `capacity` formatted lines for a UI to drain on its own thread."""
+
+    def __init__(self, capacity=2000) -> None:
+        super().__init__()
+        self.lines = deque(maxlen=capacity)
+
+    def emit(self, record):
+        tag = "info" if record.levelno < logging.ERROR else "error"
+        self.lines.append((self.format(record), tag))
+
+    def drain(self, limit=500):
+        lines = []
+        while self.lines and len(lines) < limit:
+            lines.append(self.lines.popleft())
+        return lines
+
+
+class LogPipeline:
+    """Moves handler I/O off the scraping threads: the logger only enqueues records, and one
+    listener thread hands them to the real handlers, flushing them at least every flush_interval."""
+
+    def __init__(self, logger, handlers, sample_every=10, flush_interval=1.0) -> None:
+        self.logger = logger
+        self.handlers = list(handlers)
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+        self.queue_handler = QueueHandler(self.queue)
+        self.queue_handler.addFilter(SamplingFilter(sample_every))
+        self.thread = None
+
+    def start(self):
+        self.logger.addHandler(self.queue_handler)
+        self.thread = threading.Thread(target=self.listen, name="log-pipeline", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def listen(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self.flush()
+                continue
+            if record is None:
+                break
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+        self.flush()
+
+    def flush(self):
+        for handler in self.handlers:
+            handler.flush()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.logger.removeHandler(self.queue_handler)
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        for handler in self.handlers:
+            handler.close()
+
+
+def start_logging(name="ExcelProcessor", log_file="logs.log", handlers=(), level=logging.DEBUG, sample_every=10):
+    """Routes the named logger through a LogPipeline writing to log_file plus any extra handlers."""
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = BatchedFileHandler(log_file)
+    for handler in (file_handler, *handlers):
+        handler.setFormatter(formatter)
+    return LogPipeline(logger, [file_handler, *handlers], sample_every=sample_every).start()
@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageTimings:
+    """Count, sum and max of every observation, plus the newest `window` samples for quantiles."""
+
+    def __init__(self, window=5000) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        summary = {"count": self.count, "sum": round(self.total, 6), "max": round(self.max, 6)}
+        for quantile in QUANTILES:
+            index = min(len(ordered) - 1, int(quantile * len(ordered)))
+            summary[f"p{int(quantile * 100)}"] = round(ordered[index], 6) if ordered else 0.0
+        return summary
+
+
+class Metrics:
+    """Stage latencies and counters for one process, exportable as JSON or Prometheus text."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.monotonic()
+            self.stages = {}
+            self.counters = {}
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            timings = self.stages.get(stage)
+            if timings is None:
+                timings = self.stages[stage] = StageTimings()
+            timings.observe(seconds)
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            stages = {stage: timings.summary() for stage, timings in self.stages.items()}
+            counters = dict(self.counters)
+        rows = counters.get("rows_finished", 0)
+        return {
+            "elapsed_sec": round(elapsed, 3),
+            "rows_per_min": round(rows / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            "counters": counters,
+            "stages": stages,
+        }
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = [
+            "# TYPE tps_rows_per_min gauge",
+            f"tps_rows_per_min {snapshot['rows_per_min']}",
+        ]
+        for counter, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE tps_{counter}_total counter")
+            lines.append(f"tps_{counter}_total {value}")
+        lines.append("# TYPE tps_stage_seconds summary")
+        for stage, summary in sorted(snapshot["stages"].items()):
+            for quantile in QUANTILES:
+                lines.append(f'tps_stage_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                             f'{summary[f"p{int(quantile * 100)}"]}')
+            lines.append(f'tps_stage_seconds_sum{{stage="{stage}"}} {summary["sum"]}')
+            lines.append(f'tps_stage_seconds_count{{stage="{stage}"}} {summary["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self):
+        snapshot = self.snapshot()
+        lines = [f"Throughput: {snapshot['rows_per_min']} rows/min over {snapshot['elapsed_sec']}s"]
+        for stage, summary in sorted(snapshot["stages"].items(), key=lambda item: -item[1]["sum"]):
+            lines.append(
+                f"{stage}: n={summary['count']} total={summary['sum']:.1f}s "
+                f"p50={summary['p50']:.3f}s p95={summary['p95']:.3f}s p99={summary['p99']:.3f}s"
+            )
+        lines.append(f"Counters: {snapshot['counters']}")
+        return lines
+
+    def write(self, path):
+        """Writes a .json snapshot, or Prometheus text for any other extension, replacing path atomically."""
+        if path.endswith(".json"):
+            body = json.dumps(self.snapshot(), indent=2)
+        else:
+            body = self.prometheus_text()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(body)
+        os.replace(temp_path, path)
+
+    def write_every(self, path, interval=10.0):
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                self.write(path)
+
+        threading.Thread(target=loop, name="metrics-writer", daemon=True).start()
+        return stop
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.prometheus_text(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(registry.snapshot()), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+
+metrics = Metrics()
+
+
+def timed(stage):
+    """Records every call of the decorated function, sync or async, under stage."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with metrics.timer(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,307 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# Where time and memory go, by file or function name, for the summary
+AREAS = {
+    "parsing": ("tps_extract", "lxml", "bs4", "BeautifulSoup"),
+    "fuzzy matching": ("address_match", "address_normalize", "rapidfuzz", "fuzzywuzzy", "Levenshtein"),
+    "dataframe": ("pandas", "numpy", "openpyxl", "result_sink"),
+}
+# Leaf frames of threads that are only waiting; left out of the sampled hotspot list
+IDLE_LEAVES = {"wait", "select", "poll", "acquire", "sleep", "readinto", "accept", "get", "result", "_worker", "run_forever"}
+# From 3.12 on cProfile hooks sys.monitoring: one enabled profiler sees every thread, and a second
+# concurrent enable() raises ValueError, so the window gets a single process-wide profiler there
+PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+# Service threads whose time is not scraping work, including the benchmark's local stand-in
+SKIPPED_THREADS = ("log-pipeline", "metrics-", "profiler-", "stand-in")
+
+
+def area_of(location):
+    for area, patterns in AREAS.items():
+        if any(pattern in location for pattern in patterns):
+            return area
+    return None
+
+
+def new_run_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+class Profiler:
+    """On-demand profiling of a window of rows: rows skip..skip+rows are profiled, then the results
+    are written to out_dir/<run_id>/ by finish().
+
+    mode "cprofile" runs one cProfile.Profile per thread around each windowed row and around the
+    hooked stages that run on other threads (page parsing in the executor, the Excel export); on
+    Python 3.12+ one profiler covers every thread while the window is open. A profiler that fails
+    to start or stop only loses its data, never the row.
+    mode "sampling" snapshots every thread's stack each `interval` seconds while the window is open
+    and writes folded stacks for flamegraph.pl/speedscope. With trace_allocations, tracemalloc runs
+    while the window is open and around the export.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.configure(None)
+
+    def configure(self, mode, rows=200, skip=0, out_dir="profiles", interval=0.005, trace_allocations=True,
+                  run_id=None):
+        with self.lock:
+            self.mode = mode
+            self.enabled = mode is not None
+            self.rows = rows
+            self.skip = skip
+            self.out_dir = out_dir
+            self.interval = interval
+            self.trace_allocations = trace_allocations
+            self.run_id = run_id or new_run_id()
+            self.state = "armed"
+            self.started_rows = 0
+            self.finished_rows = 0
+            self.opened_at = None
+            self.window_sec = 0.0
+            self.profiles = []
+            self.shared = None
+            self.errors = 0
+            self.local = threading.local()
+            self.samples = Counter()
+            self.sampler_stop = None
+            self.snapshots = {}
+
+    @property
+    def path(self):
+        return os.path.join(self.out_dir, self.run_id)
+
+    # Window bookkeeping; callers hold self.lock
+
+    def open(self):
+        self.state = "open"
+        self.opened_at = time.perf_counter()
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(5)
+        if self.mode == "cprofile" and not PER_THREAD_CPROFILE:
+            self.shared = self.start_profile()
+        if self.mode == "sampling":
+            self.sampler_stop = threading.Event()
+            threading.Thread(target=self.sample, args=(self.sampler_stop,), name="profiler-sampler", daemon=True).start()
+
+    def close(self):
+        self.state = "closed"
+        self.window_sec = time.perf_counter() - self.opened_at
+        if self.sampler_stop is not None:
+            self.sampler_stop.set()
+        if self.shared is not None:
+            self.stop_profile(self.shared)
+            self.shared = None
+        if tracemalloc.is_tracing():
+            self.snapshots["rows"] = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def enter_row(self):
+        with self.lock:
+            if self.state not in ("armed", "open"):
+                return False
+            index = self.started_rows
+            self.started_rows += 1
+            if not self.skip <= index < self.skip + self.rows:
+                return False
+            if self.state == "armed":
+                self.open()
+            return True
+
+    def leave_row(self):
+        with self.lock:
+            self.finished_rows += 1
+            if self.finished_rows >= self.rows and self.state == "open":
+                self.close()
+
+    def start_profile(self, profile=None):
+        """Enables profile (a new one by default) and returns it, or None if cProfile refused."""
+        profile = profile or cProfile.Profile()
+        try:
+            profile.enable()
+        except (ValueError, RuntimeError):
+            self.errors += 1
+            return None
+        if profile not in self.profiles:
+            self.profiles.append(profile)
+        return profile
+
+    def stop_profile(self, profile):
+        try:
+            profile.disable()
+        except (ValueError, RuntimeError):
+            self.errors += 1
+
+    def call(self, func, args, kwargs):
+        if self.mode != "cprofile" or getattr(self.local, "depth", 0):
+            return func(*args, **kwargs)
+        if not PER_THREAD_CPROFILE and self.state == "open":
+            # Already covered by the process-wide profiler
+            return func(*args, **kwargs)
+        with self.lock:
+            profile = self.start_profile(getattr(self.local, "profile", None) if PER_THREAD_CPROFILE else None)
+        if profile is None:
+            return func(*args, **kwargs)
+        self.local.profile = profile
+        self.local.depth = 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.stop_profile(profile)
+            self.local.depth = 0
+
+    def row(self, func):
+        """Marks the per-row entry point; only rows inside the window are profiled."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or not self.enter_row():
+                return func(*args, **kwargs)
+            try:
+                return self.call(func, args, kwargs)
+            finally:
+                self.leave_row()
+        return wrapper
+
+    def stage(self, name, allocations=False):
+        """Marks work that runs outside the row threads. Profiled while the window is open; with
+        allocations, any time before finish() and with its own tracemalloc snapshot."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or self.state == "finished" or (self.state != "open" and not allocations):
+                    return func(*args, **kwargs)
+                if not allocations or tracemalloc.is_tracing():
+                    return self.call(func, args, kwargs)
+                tracemalloc.start(5)
+                try:
+                    return self.call(func, args, kwargs)
+                finally:
+                    self.snapshots[name] = tracemalloc.take_snapshot()
+                    tracemalloc.stop()
+            return wrapper
+        return decorator
+
+    def sample(self, stop):
+        names = {}
+        own = threading.get_ident()
+        while not stop.wait(self.interval):
+            frames = sys._current_frames()
+            if any(ident not in names for ident in frames):
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                name = names.get(ident, str(ident))
+                if ident == own or name.startswith(SKIPPED_THREADS):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                stack.append(name.split("_")[0])
+                self.samples[";".join(reversed(stack))] += 1
+
+    def finish(self):
+        """Writes the collected profiles and returns their directory, or None when nothing ran."""
+        with self.lock:
+            if not self.enabled or self.state == "finished":
+                return None
+            if self.state == "open":
+                self.close()
+            self.state = "finished"
+            profiled_rows = min(self.rows, max(0, self.started_rows - self.skip))
+        if not profiled_rows and not self.snapshots:
+            return None
+        os.makedirs(self.path, exist_ok=True)
+        areas = {}
+        if self.mode == "cprofile" and self.profiles:
+            areas = self.write_cprofile()
+        elif self.mode == "sampling":
+            areas = self.write_samples()
+        for name, snapshot in self.snapshots.items():
+            self.write_allocations(name, snapshot)
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump({
+                "run_id": self.run_id,
+                "mode": self.mode,
+                "skip": self.skip,
+                "rows": profiled_rows,
+                "window_sec": round(self.window_sec, 3),
+                "profiler_errors": self.errors,
+                "areas": areas,
+            }, file, indent=2)
+        return self.path
+
+    def write_cprofile(self):
+        stats = pstats.Stats(self.profiles[0])
+        for profile in self.profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(os.path.join(self.path, "cprofile.pstats"))
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats("cumulative").print_stats(60)
+        stats.sort_stats("tottime").print_stats(40)
+        with open(os.path.join(self.path, "cprofile.txt"), "w", encoding="utf-8") as file:
+            file.write(text.getvalue())
+        # Self time by area, so nested calls are not counted twice
+        areas = Counter()
+        for (filename, _, name), (_, _, tottime, _, _) in stats.stats.items():
+            area = area_of(f"{filename}:{name}")
+            if area:
+                areas[area] += tottime
+        return {area: round(seconds, 3) for area, seconds in areas.items()}
+
+    def write_samples(self):
+        with open(os.path.join(self.path, "samples.folded"), "w", encoding="utf-8") as file:
+            for stack, count in sorted(self.samples.items()):
+                file.write(f"{stack} {count}\n")
+        leaves = Counter()
+        areas = Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(";")
+            if frames[-1].rsplit(":", 1)[-1] in IDLE_LEAVES:
+                continue
+            leaves[frames[-1]] += count
+            # Attribute the sample to the innermost frame that belongs to an area
+            for frame in reversed(frames):
+                area = area_of(frame)
+                if area:
+                    areas[area] += count
+                    break
+        with open(os.path.join(self.path, "samples.txt"), "w", encoding="utf-8") as file:
+            file.write(f"Busy samples every {self.interval}s, by innermost frame\n")
+            for leaf, count in leaves.most_common(60):
+                file.write(f"{count:8d}  {leaf}\n")
+        return {area: count for area, count in areas.items()}
+
+    def write_allocations(self, name, snapshot):
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        by_area = Counter()
+        for statistic in snapshot.statistics("filename"):
+            by_area[area_of(statistic.traceback[0].filename) or "other"] += statistic.size
+        with open(os.path.join(self.path, f"allocations-{name}.txt"), "w", encoding="utf-8") as file:
+            file.write("Live allocations by area (KiB)\n")
+            for area, size in by_area.most_common():
+                file.write(f"{size / 1024:12.1f}  {area}\n")
+            file.write("\nTop allocation sites\n")
+            for statistic in snapshot.statistics("lineno")[:40]:
+                file.write(f"{statistic}\n")
+            file.write("\nTop allocation tracebacks\n")
+            for statistic in snapshot.statistics("traceback")[:10]:
+                file.write(f"{statistic}\n")
+                file.write("\n".join(f"    {line}" for line in statistic.traceback.format()) + "\n")
+
+
+profiler = Profiler()
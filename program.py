@@ -14,11 +14,13 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import openpyxl
-import pandas as pd
 import os
 
 from credentials import SCRAPEOPS_CREDS
+from scheduler import RowScheduler
+from run_journal import RowKeys, RunJournal, run_journal_path_for
+from input_reader import SourceReader
+from result_sink import JsonlResultSink, journal_path_for
 
 @contextmanager
 def get_driver():
@@ -215,7 +217,7 @@ class Truepeoplesearch:
         log.error("Got no emails.")
         return []
 
-def process_row(row, result_excel_file_path):
+def scrape_row(row):
     log.info(f"Scraping for: {row}")
     cities = Usps.get_city_from_zipcode(row["ZIP"])
     rows = []
@@ -239,21 +241,12 @@ def process_row(row, result_excel_file_path):
         "EMAIL": emails
     }
         rows.append(new_row)
-    df = pd.DataFrame(rows)
-    if os.path.exists(result_excel_file_path):
-        existing_df = pd.read_excel(
-            result_excel_file_path, names=["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP", "EMAIL"], engine="openpyxl"
-        )
-        existing_df = pd.concat([existing_df, df], ignore_index=True)
-        df = existing_df
-    else:
-        with open(result_excel_file_path, "w"):
-            pass
+    return rows
+
 
-    df = df.explode("EMAIL", ignore_index=True)
-    duplicated_rows = df.duplicated(subset=["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP"])
-    df.loc[duplicated_rows, ["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP"]] = ""
-    log.info(f"Saved to excel: {result_excel_file_path}")
+def export_rows(sink: JsonlResultSink, result_excel_file_path):
+    # This entry point never wrote a STATUS column
+    df = sink.to_dataframe().drop(columns="STATUS")
 
     def show_try_again_popup():
         result = messagebox.askretrycancel("Error", "Updating excel could not be possible. Please close the file if you are viewing")
@@ -262,12 +255,18 @@ def process_row(row, result_excel_file_path):
     while True:
         try:
             df.to_excel(result_excel_file_path, index=False)
+            log.info(f"Saved to excel: {result_excel_file_path}")
             break
         except:
             if not show_try_again_popup():
-                continue
+                log.error(f"Excel not saved; the rows are kept in {sink.path}")
+                break
+
+def process_row(row, sink: JsonlResultSink):
+    sink.write(scrape_row(row))
+
 
-def main():
+def main(workers=4):
     title = 'Truepeoplesearch & USPS scraper'
     root = tk.Tk()
     root.geometry("800x800")
@@ -310,17 +309,7 @@ def main():
 
     root.mainloop()
 
-    if os.path.exists(result_excel_file_path):
-        base_path, extension = os.path.splitext(result_excel_file_path)
-        count = 1
-        result_excel_file_path = f"{base_path}({count}){extension}"
-
-        while os.path.exists(result_excel_file_path):
-            count += 1
-            result_excel_file_path = f"{base_path}({count}){extension}"
-
-    df = pd.read_excel(data, header=None, engine="openpyxl")
-    df.columns = ["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP"]
+    source = SourceReader(data, header=False)
 
     progress_window = tk.Tk()
     progress_window.title(f"Progress: {title}")
@@ -334,16 +323,40 @@ def main():
     progress_label = tk.Label(progress_frame, text="0/0 (0%)")
     progress_label.grid(row=1, column=0, pady=5)
 
-    total_rows = len(df)
-
-    for index, row in df.iterrows():
-        finished = index + 1
+    # Rerunning into the same output resumes it: rows already in the run journal are skipped
+    run_journal = RunJournal(run_journal_path_for(result_excel_file_path))
+    # Rows go to an append-only journal; the workbook is written once at the end
+    sink = JsonlResultSink(journal_path_for(result_excel_file_path))
+    row_keys = RowKeys()
+    keys = {}
+    total_rows = len(source)
+    finished = 0
+
+    def pending():
+        nonlocal finished
+        for index, row in source:
+            key = row_keys.key(row)
+            if run_journal.should_run(key):
+                keys[index] = key
+                yield index, row
+            else:
+                finished += 1
+
+    def on_result(index, row, rows):
+        nonlocal finished
+        finished += 1
         progress = (finished / total_rows) * 100
         progress_bar["value"] = progress
         progress_label.config(text=f"{finished}/{total_rows} ({progress:.2f}%)")
         progress_window.update_idletasks()  # Ensure the UI updates
 
-        process_row(row, result_excel_file_path)
+        key = keys.pop(index)
+        sink.write(rows, key)
+        run_journal.mark(key, "SUCCESS")
+
+    RowScheduler(max_workers=workers).run(pending(), scrape_row, on_result)
+    run_journal.close()
+    export_rows(sink, result_excel_file_path)
 
     progress_window.destroy()
 
@@ -0,0 +1,187 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from metrics import metrics
+
+# ScrapeOps bills a plain request as 1 credit and a JavaScript-rendered one as 10
+CREDIT_COST = {False: 1, True: 10}
+# Failures raised before the request reached the provider, so nothing was billed
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class BudgetExhausted(Exception):
+    retryable = False
+
+
+def request_kind(url):
+    return "search" if "/results" in url else "detail"
+
+
+class ProxyGovernor:
+    """Client-side limits for the ScrapeOps proxy, shared by every worker.
+
+    A token bucket caps requests per second, a semaphore caps requests in flight, and an optional
+    credit budget caps what one run may spend. Credits are reserved before a request and spent once
+    it may have reached the provider, even if the caller then cancels it; they are refunded only
+    when it never went out or the provider answered with a response it does not bill. Once the remaining credits drop below low_budget_ratio of the budget the run
+    degrades: "search_only" keeps search pages going but refuses detail pages, "pause" holds every
+    request until add_credits() or a refund makes room, and fails it with BudgetExhausted after
+    pause_sec. All coroutines run on the shared proxy session loop.
+    """
+
+    def __init__(self, requests_per_sec=5.0, max_in_flight=10, credit_budget=None,
+                 low_budget_ratio=0.1, on_low_budget="search_only", pause_sec=300.0) -> None:
+        self.requests_per_sec = requests_per_sec
+        self.burst = max(1.0, requests_per_sec)
+        self.max_in_flight = max_in_flight
+        self.credit_budget = credit_budget
+        self.low_budget_ratio = low_budget_ratio
+        self.on_low_budget = on_low_budget
+        self.pause_sec = pause_sec
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.semaphore = None
+        self.resumed = None
+        self.loop = None
+        self.in_flight = 0
+        self.credits_reserved = 0
+        self.credits_used = 0
+        self.requests = 0
+        self.refused = 0
+        self.throttled_sec = 0.0
+        self.started = time.monotonic()
+
+    def configure(self, requests_per_sec=None, max_in_flight=None, credit_budget=None, on_low_budget=None,
+                  pause_sec=None):
+        if requests_per_sec is not None:
+            self.requests_per_sec = requests_per_sec
+            self.burst = max(1.0, requests_per_sec)
+        if max_in_flight is not None:
+            self.max_in_flight = max_in_flight
+            self.semaphore = None
+        if credit_budget is not None:
+            self.credit_budget = credit_budget
+        if on_low_budget is not None:
+            self.on_low_budget = on_low_budget
+        if pause_sec is not None:
+            self.pause_sec = pause_sec
+
+    def credits_remaining(self):
+        if self.credit_budget is None:
+            return None
+        return self.credit_budget - self.credits_used - self.credits_reserved
+
+    def mode(self):
+        remaining = self.credits_remaining()
+        if remaining is None:
+            return "normal"
+        if remaining <= 0:
+            return "exhausted"
+        if remaining < self.credit_budget * self.low_budget_ratio:
+            return "low"
+        return "normal"
+
+    def add_credits(self, credits):
+        """Raises the budget and wakes paused requests; safe to call from any thread."""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            self.top_up(credits)
+        else:
+            loop.call_soon_threadsafe(self.top_up, credits)
+
+    def top_up(self, credits):
+        self.credit_budget = (self.credit_budget or 0) + credits
+        if self.resumed is not None:
+            self.resumed.set()
+
+    async def reserve(self, cost, kind):
+        deadline = None
+        while True:
+            mode = self.mode()
+            remaining = self.credits_remaining()
+            if mode == "normal" or (mode == "low" and self.on_low_budget == "search_only" and kind == "search"):
+                if remaining is None or remaining >= cost:
+                    self.credits_reserved += cost
+                    return
+            message = f"Credit budget of {self.credit_budget} is too low for a {kind} request ({mode})"
+            if self.on_low_budget != "pause":
+                self.refused += 1
+                raise BudgetExhausted(message)
+            loop = asyncio.get_running_loop()
+            if self.resumed is None or self.loop is not loop:
+                # The proxy session loop is replaced when the runtime is reconfigured
+                self.loop, self.resumed = loop, asyncio.Event()
+            if deadline is None:
+                deadline = loop.time() + self.pause_sec
+            self.resumed.clear()
+            try:
+                await asyncio.wait_for(self.resumed.wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                self.refused += 1
+                raise BudgetExhausted(f"{message}; paused for {self.pause_sec:.0f}s without new credits") from None
+
+    async def take_token(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.requests_per_sec)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) / self.requests_per_sec
+            self.throttled_sec += wait
+            await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def slot(self, url, render_js=False):
+        cost = CREDIT_COST[bool(render_js)]
+        await self.reserve(cost, request_kind(url))
+        spent = False
+        try:
+            if self.semaphore is None:
+                self.semaphore = asyncio.Semaphore(self.max_in_flight)
+            async with self.semaphore:
+                await self.take_token()
+                self.in_flight += 1
+                self.requests += 1
+                spent = True
+                metrics.count("proxy_requests")
+                metrics.count("credits", cost)
+                try:
+                    yield
+                except asyncio.CancelledError:
+                    metrics.count("proxy_cancelled")
+                    raise
+                except Exception as e:
+                    if isinstance(e, UNSENT_ERRORS) or not getattr(e, "billed", True):
+                        spent = False
+                        metrics.count("credits_refunded", cost)
+                    raise
+                finally:
+                    self.in_flight -= 1
+        finally:
+            self.credits_reserved -= cost
+            if spent:
+                self.credits_used += cost
+            elif self.resumed is not None and self.loop is asyncio.get_running_loop():
+                # A refund can lift the run back over the low-budget line
+                self.resumed.set()
+
+    def utilization(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "requests": self.requests,
+            "requests_per_sec": round(self.requests / elapsed, 3),
+            "requests_per_sec_limit": self.requests_per_sec,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "credits_used": self.credits_used,
+            "credit_budget": self.credit_budget,
+            "credits_remaining": self.credits_remaining(),
+            "refused": self.refused,
+            "throttled_sec": round(self.throttled_sec, 3),
+            "mode": self.mode(),
+        }
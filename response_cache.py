@@ -0,0 +1,140 @@
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import OrderedDict
+
+
+def normalize_url(url):
+    parts = urllib.parse.urlsplit(url.strip())
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    query = urllib.parse.urlencode(sorted(query), quote_via=urllib.parse.quote)
+    path = urllib.parse.quote(urllib.parse.unquote(parts.path)) or "/"
+    return urllib.parse.urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+class CachedResponse:
+    def __init__(self, text, status_code=200) -> None:
+        self.text = text
+        self.status_code = status_code
+
+
+class ResponseCache:
+    """Page cache keyed by normalized target URL: an in-memory LRU in front of a SQLite file.
+
+    Bodies are zlib-compressed on disk when compress is set. Entries older than ttl_sec are
+    ignored, and the oldest entries are evicted once the stored bodies exceed max_bytes. Each entry
+    keeps the credits its fetch cost, so hits can report what they saved.
+    """
+
+    def __init__(self, path="response_cache.sqlite", ttl_sec=7 * 24 * 3600, max_bytes=500 * 1024 * 1024,
+                 memory_entries=256, compress=True, enabled=True) -> None:
+        self.path = path
+        self.enabled = enabled
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.compress = compress
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.initialized = False
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "credits_saved": 0}
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self.initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, body BLOB NOT NULL, compressed INTEGER NOT NULL, "
+                "size INTEGER NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_stored_at ON responses (stored_at)")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(responses)")]
+            if "cost" not in columns:
+                # Caches written before costs were stored hold plain fetches
+                conn.execute("ALTER TABLE responses ADD COLUMN cost INTEGER NOT NULL DEFAULT 1")
+            conn.commit()
+            self.initialized = True
+        return conn
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def remember(self, key, text, stored_at, cost):
+        with self.lock:
+            self.memory[key] = (text, stored_at, cost)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def get(self, url):
+        if not self.enabled:
+            return None
+        key = normalize_url(url)
+        now = time.time()
+        with self.lock:
+            found = self.memory.get(key)
+            if found is not None and now - found[1] <= self.ttl_sec:
+                self.memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                self.counters["credits_saved"] += found[2]
+                return found[0]
+        conn = self.connect()
+        try:
+            found = conn.execute(
+                "SELECT body, compressed, stored_at, cost FROM responses WHERE key = ? AND stored_at >= ?",
+                (key, now - self.ttl_sec),
+            ).fetchone()
+        finally:
+            conn.close()
+        if found is None:
+            self.count("misses")
+            return None
+        body, compressed, stored_at, cost = found
+        text = (zlib.decompress(body) if compressed else body).decode("utf-8")
+        self.remember(key, text, stored_at, cost)
+        self.count("disk_hits")
+        self.count("credits_saved", cost)
+        return text
+
+    def set(self, url, text, cost=1):
+        """Stores a page; cost is the credits its fetch took (10 for a render_js page)."""
+        if not self.enabled:
+            return
+        key = normalize_url(url)
+        now = time.time()
+        body = text.encode("utf-8")
+        if self.compress:
+            body = zlib.compress(body, 6)
+        self.remember(key, text, now, cost)
+        conn = self.connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, compressed, size, stored_at, cost) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body, int(self.compress), len(body), now, cost),
+            )
+            conn.execute("DELETE FROM responses WHERE stored_at < ?", (now - self.ttl_sec,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # Drop the oldest entries until the store is back under max_bytes
+                for old_key, size in conn.execute("SELECT key, size FROM responses ORDER BY stored_at").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    total -= size
+            conn.commit()
+        finally:
+            conn.close()
+        self.count("stores")
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+import uuid
+
+import pandas as pd
+
+from metrics import timed
+from profiling import profiler
+
+COLUMNS = ["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP", "EMAIL", "STATUS"]
+KEY_COLUMNS = ["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP", "STATUS"]
+
+
+def journal_path_for(result_excel_file_path):
+    base_path, _ = os.path.splitext(result_excel_file_path)
+    return f"{base_path}.jsonl"
+
+
+def explode_rows(df: pd.DataFrame):
+    df = df.explode("EMAIL", ignore_index=True)
+    duplicated_rows = df.duplicated(subset=KEY_COLUMNS)
+    df.loc[duplicated_rows, KEY_COLUMNS] = ""
+    return df
+
+
+def rows_to_dataframe(rows):
+    return explode_rows(pd.DataFrame(rows, columns=COLUMNS))
+
+
+class JsonlResultSink:
+    """Append-only store of scraped rows. Each row is one JSON line, the workbook is built from it on demand."""
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, rows, row_key=None):
+        if row_key is not None:
+            # A retried row is written again under the same key; read() keeps only its latest batch
+            batch = uuid.uuid4().hex
+            rows = [dict(row, ROW_KEY=row_key, BATCH=batch) for row in rows]
+        lines = "".join(json.dumps(row, default=str) + "\n" for row in rows)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return []
+        rows = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a truncated last line behind
+                    continue
+        latest_batch = {row["ROW_KEY"]: row["BATCH"] for row in rows if "ROW_KEY" in row}
+        return [row for row in rows if "ROW_KEY" not in row or latest_batch[row["ROW_KEY"]] == row["BATCH"]]
+
+    def to_dataframe(self):
+        return rows_to_dataframe(self.read())
+
+    @timed("excel_export")
+    @profiler.stage("excel_export", allocations=True)
+    def export_excel(self, result_excel_file_path):
+        df = self.to_dataframe()
+        df.to_excel(result_excel_file_path, index=False)
+        return df
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("Usage: python result_sink.py <journal.jsonl> <result.xlsx>")
+        sys.exit(1)
+    JsonlResultSink(sys.argv[1]).export_excel(sys.argv[2])
@@ -0,0 +1,151 @@
+import asyncio
+import contextvars
+import email.utils
+import functools
+import random
+import time
+
+from metrics import metrics
+
+
+class ProxyRequestError(Exception):
+    # ScrapeOps does not charge for failed (non 2xx) responses
+    billed = False
+
+    def __init__(self, message, status_code=None, retry_after=None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    """Retries left for one top-level call. Nested retrying calls draw from the same budget, so
+    an inner 5x retry inside an outer 3x retry costs at most the budget, not 15 attempts."""
+
+    def __init__(self, retries) -> None:
+        self.retries = retries
+
+    def consume(self):
+        if self.retries <= 0:
+            return False
+        self.retries -= 1
+        return True
+
+
+current_budget = contextvars.ContextVar("current_budget", default=None)
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter and per-status rules.
+
+    Errors marked retryable = False or carrying a status in no_retry_statuses fail at once; 429
+    waits for Retry-After when the proxy sends one. budget is the number of retries shared by all
+    nested retrying calls under the outermost one.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=30.0, budget=6,
+                 no_retry_statuses=(400, 401, 403, 404, 410), honor_retry_after=True) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.no_retry_statuses = set(no_retry_statuses)
+        self.honor_retry_after = honor_retry_after
+
+    def should_retry(self, error):
+        if not getattr(error, "retryable", True):
+            return False
+        status_code = getattr(error, "status_code", None)
+        return status_code not in self.no_retry_statuses
+
+    def delay(self, attempt, error):
+        retry_after = getattr(error, "retry_after", None)
+        if self.honor_retry_after and retry_after is not None:
+            return min(retry_after, self.max_delay)
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        # Equal jitter: keep half of the backoff, randomize the other half
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+def retry(policy: RetryPolicy):
+    def decorator(func):
+        def next_delay(log, attempt, error, budget):
+            log.error(f'{func.__name__} failed on attempt {attempt}: {str(error)}')
+            if attempt >= policy.max_attempts:
+                log.warning(f'{func.__name__} reached maximum retry count of {policy.max_attempts}.')
+                return None
+            if not policy.should_retry(error):
+                log.warning(f'{func.__name__} got a non-retryable error, giving up.')
+                return None
+            if not budget.consume():
+                log.warning(f'{func.__name__} ran out of retry budget.')
+                return None
+            delay = policy.delay(attempt, error)
+            metrics.count("retries")
+            metrics.observe("retry_sleep", delay)
+            log.info(f'Retrying {func.__name__} in {delay:.1f} seconds...')
+            return delay
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                log = args[0].log
+                budget = current_budget.get()
+                token = None
+                if budget is None:
+                    budget = RetryBudget(policy.budget)
+                    token = current_budget.set(budget)
+                try:
+                    attempt = 0
+                    while True:
+                        attempt += 1
+                        try:
+                            return await func(*args, **kwargs)
+                        except Exception as e:
+                            delay = next_delay(log, attempt, e, budget)
+                            if delay is None:
+                                raise
+                        await asyncio.sleep(delay)
+                finally:
+                    if token is not None:
+                        current_budget.reset(token)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            log = args[0].log
+            budget = current_budget.get()
+            token = None
+            if budget is None:
+                budget = RetryBudget(policy.budget)
+                token = current_budget.set(budget)
+            try:
+                attempt = 0
+                while True:
+                    attempt += 1
+                    try:
+                        return func(*args, **kwargs)
+                    except Exception as e:
+                        delay = next_delay(log, attempt, e, budget)
+                        if delay is None:
+                            raise
+                    time.sleep(delay)
+            finally:
+                if token is not None:
+                    current_budget.reset(token)
+        return wrapper
+    return decorator
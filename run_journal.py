@@ -0,0 +1,73 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+KEY_FIELDS = ["FIRST_NAME", "LAST_NAME", "STREET", "ZIP"]
+
+
+def run_journal_path_for(result_excel_file_path):
+    base_path, _ = os.path.splitext(result_excel_file_path)
+    return f"{base_path}.run.sqlite"
+
+
+class RowKeys:
+    """Stable keys for input rows: a hash of the identifying fields plus how many times the same
+    fields were already seen, so duplicate input rows still get distinct keys."""
+
+    def __init__(self) -> None:
+        self.seen = {}
+
+    def key(self, row):
+        fields = "\x1f".join(str(row[field]).strip() for field in KEY_FIELDS)
+        occurrence = self.seen.get(fields, 0)
+        self.seen[fields] = occurrence + 1
+        return hashlib.sha1(f"{fields}\x1e{occurrence}".encode("utf-8")).hexdigest()
+
+
+def row_status(rows):
+    return "ERROR" if any(new_row.get("STATUS") == "ERROR" for new_row in rows) else "SUCCESS"
+
+
+class RunJournal:
+    """Durable record of which input rows finished, and how, for one destination file."""
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS finished_rows ("
+            "row_key TEXT PRIMARY KEY, status TEXT NOT NULL, attempts INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+        self.statuses = dict(self.conn.execute("SELECT row_key, status FROM finished_rows"))
+
+    def should_run(self, key, retry_errors=True):
+        status = self.statuses.get(key)
+        if status is None:
+            return True
+        return retry_errors and status == "ERROR"
+
+    def mark(self, key, status):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO finished_rows (row_key, status, attempts, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(row_key) DO UPDATE SET status = excluded.status, "
+                "attempts = finished_rows.attempts + 1, updated_at = excluded.updated_at",
+                (key, status, time.time()),
+            )
+            self.conn.commit()
+            self.statuses[key] = status
+
+    def counts(self):
+        counts = {}
+        for status in self.statuses.values():
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
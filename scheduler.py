@@ -0,0 +1,50 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+
+class RowScheduler:
+    """Runs a per-row job on a bounded worker pool and hands results back in input order.
+
+    At most max_workers jobs run at once and at most max_workers * prefetch are queued, so a large
+    input is never submitted all at once. on_result is always called from the thread that called run().
+    """
+
+    def __init__(self, max_workers=4, use_processes=False, prefetch=2) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.use_processes = use_processes
+        self.prefetch = max(1, int(prefetch))
+
+    def executor(self):
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="row-worker")
+
+    def run(self, rows, work, on_result, *args):
+        """rows yields (index, row); work(row, *args) runs on the pool; on_result(index, row, result) runs in order."""
+        window = self.max_workers * self.prefetch
+        rows = iter(rows)
+        in_flight = {}
+        done = {}
+        order = deque()
+        seq = 0
+        exhausted = False
+        with self.executor() as executor:
+            while True:
+                while not exhausted and len(in_flight) + len(done) < window:
+                    try:
+                        index, row = next(rows)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    in_flight[executor.submit(work, row, *args)] = seq
+                    order.append((seq, index, row))
+                    seq += 1
+                if not in_flight and not done:
+                    break
+                if in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        done[in_flight.pop(future)] = future
+                while order and order[0][0] in done:
+                    position, index, row = order.popleft()
+                    on_result(index, row, done.pop(position).result())
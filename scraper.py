@@ -1,61 +1,47 @@
+import asyncio
 import urllib.parse
 from bs4 import BeautifulSoup
-from fuzzywuzzy import fuzz
-import requests
-from selenium import webdriver
 import logging
 import warnings
-import time
 from logging import config
-from contextlib import contextmanager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-import openpyxl
-import pandas as pd
 import os
 
 from credentials import SCRAPEOPS_CREDS
+from result_sink import JsonlResultSink
+import tps_extract
+from address_match import matcher_for
+from address_normalize import zip5
+from retry_policy import ProxyRequestError, RetryPolicy, parse_retry_after, retry
+from zip_cache import ZipCityCache
+from driver_pool import DriverPool
+from http_session import ProxySession
+from response_cache import CachedResponse, ResponseCache
+from rate_limiter import CREDIT_COST, ProxyGovernor
+from fetch_strategy import FetchStrategy, looks_blocked
+from zip_resolver import default_resolvers, unique_city
+from coalesce import Coalescer
+from metrics import metrics, timed
+from profiling import profiler
+
+PROXY_URL = os.environ.get("SCRAPEOPS_PROXY_URL", "https://proxy.scrapeops.io/v1/")
+USPS_URL = os.environ.get("USPS_LOOKUP_URL", "https://tools.usps.com/zip-code-lookup.htm?citybyzipcode")
+
+zip_cache = ZipCityCache()
+zip_resolvers = default_resolvers()
+driver_pool = DriverPool()
+proxy_session = ProxySession()
+response_cache = ResponseCache()
+proxy_governor = ProxyGovernor()
+fetch_strategy = FetchStrategy()
+# Duplicate people and shared ZIPs across input rows are looked up once
+zip_lookups = Coalescer()
+person_searches = Coalescer()
 
-@contextmanager
 def get_driver():
-    chrome_options = Options()
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")  # Disable GPU acceleration (useful for headless mode)
-    chrome_options.add_argument("--no-sandbox")  # Bypass OS security model (useful for Docker)
-    chrome_options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
-    chrome_options.add_argument("blink-settings=imagesEnabled=false")
-    driver = webdriver.Chrome(options=chrome_options)
-    try:
-        yield driver
-    finally:
-        driver.quit()
-
-
-def retry(max_retry_count, interval_sec):
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            err = ''
-            log = args[0].log 
-            retry_count = 0
-            while retry_count < max_retry_count:
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    err = e
-                    retry_count += 1
-                    log.error(f'{func.__name__} failed on attempt {retry_count}: {str(e)}')
-                    if retry_count < max_retry_count:
-                        log.info(f'Retrying {func.__name__} in {interval_sec} seconds...')
-                        time.sleep(interval_sec)
-            log.warning(f'{func.__name__} reached maximum retry count of {max_retry_count}.')
-            raise Exception(err)
-        return wrapper
-    return decorator
+    return driver_pool.acquire()
 
 
 class Usps:
@@ -65,25 +51,34 @@ class Usps:
 
 
     def unique_city(self, city_list):
-        unique_cities = []
-        seen_prefixes = set()
-
-        for city in city_list:
-            prefix = city[:3]
-            if prefix not in seen_prefixes:
-                unique_cities.append(city)
-                seen_prefixes.add(prefix)
-        
-        return unique_cities
-
+        return unique_city(city_list)
 
-    @retry(max_retry_count=4, interval_sec=10)
+    @timed("get_city_from_zipcode")
     def get_city_from_zipcode(self):
+        for resolver in zip_resolvers:
+            cities = resolver.resolve(self.zip)
+            if cities:
+                self.log.debug(f"Resolved zipcode = {self.zip} offline: {cities}")
+                metrics.count("zip_offline_hits")
+                return cities
+        cities = zip_cache.get(self.zip)
+        if cities is not None:
+            self.log.debug(f"Found cities in cache for zipcode = {self.zip}: {cities}")
+            metrics.count("zip_cache_hits")
+            return cities
+        metrics.count("usps_lookups")
+        cities = self.fetch_city_from_zipcode()
+        if cities:
+            zip_cache.set(self.zip, cities)
+        return cities
+
+    @retry(RetryPolicy(max_attempts=4, base_delay=5, max_delay=30))
+    def fetch_city_from_zipcode(self):
         self.log.info(f"Fetching city of zipcode = {self.zip}")
         with get_driver() as driver:
-            driver.get("https://tools.usps.com/zip-code-lookup.htm?citybyzipcode")
+            driver.get(USPS_URL)
             zip_field = driver.find_element(By.ID, "tZip")
-            zip_field.send_keys(self.zip)
+            zip_field.send_keys(zip5(self.zip) or str(self.zip))
             submit = driver.find_element(By.ID, """cities-by-zip-code""")
             submit.click()
             wait = WebDriverWait(driver, 20)
@@ -107,168 +102,253 @@ class Truepeoplesearch:
         self.dist = dist
         self.zip = zip
         self.BASE_URL = "https://www.truepeoplesearch.com"
+        self.DETAIL_FANOUT = 5
 
-    @retry(max_retry_count=5, interval_sec=2)
-    def proxied_request(self, url, render_js=False):
-        PROXY_URL = 'https://proxy.scrapeops.io/v1/'
+    @timed("proxied_request")
+    async def proxied_request_async(self, url, render_js=False):
+        cached = await asyncio.to_thread(response_cache.get, url)
+        if cached is not None:
+            self.log.debug(f"Served from response cache: {url}")
+            metrics.count("response_cache_hits")
+            return CachedResponse(cached)
+        # Plain requests first; render_js only for pages that come back empty/blocked, or up front
+        # for URL patterns that have needed it most of the time
+        render_js = render_js or fetch_strategy.should_prerender(url)
+        response = await self.fetch_through_proxy(url, render_js)
+        blocked = looks_blocked(response.text, response.status_code)
+        fetch_strategy.record(url, render_js, blocked)
+        if blocked and not render_js:
+            self.log.info(f"Page looks empty or blocked, retrying with render_js: {url}")
+            render_js = True
+            response = await self.fetch_through_proxy(url, True)
+            blocked = looks_blocked(response.text, response.status_code)
+            fetch_strategy.record(url, True, blocked)
+        if not blocked:
+            await asyncio.to_thread(response_cache.set, url, response.text, CREDIT_COST[bool(render_js)])
+        return response
+
+    @retry(RetryPolicy(max_attempts=5, base_delay=1, max_delay=30))
+    async def fetch_through_proxy(self, url, render_js=False):
         API_KEY = SCRAPEOPS_CREDS
-        response = requests.get(
-            url=PROXY_URL,
-            params={
-                'api_key': API_KEY,
-                'url': url, 
-                # 'residential': 'true', 
-                'country': 'us',
-                'render_js': render_js
-            },
-        )
-        if response.status_code in [200, 201]:
-            return response
-        else:
-            raise Exception(f'Proxied request failed. {response.status_code}. {response.text}')
-
-    @retry(max_retry_count=3, interval_sec=5)
-    def get_pople_search_result(self, name, address):
+        async with proxy_governor.slot(url, render_js):
+            response = await proxy_session.get(
+                url=PROXY_URL,
+                params={
+                    'api_key': API_KEY,
+                    'url': url, 
+                    # 'residential': 'true', 
+                    'country': 'us',
+                    'render_js': render_js
+                },
+            )
+            if response.status_code in [200, 201]:
+                return response
+            else:
+                metrics.count("proxy_errors")
+                raise ProxyRequestError(
+                    f'Proxied request failed. {response.status_code}. {response.text}',
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get('Retry-After'))
+                )
+
+    def proxied_request(self, url, render_js=False):
+        return proxy_session.run(self.proxied_request_async(url, render_js))
+
+    @retry(RetryPolicy(max_attempts=3, base_delay=2, max_delay=30))
+    async def get_pople_search_result(self, name, address):
         base_url = f"{self.BASE_URL}/results?"
         # Encode the name and address for use in a URL
         encoded_name = urllib.parse.quote(name)
         encoded_address = urllib.parse.quote(address)
         # Construct the full URL
         full_url = f"{base_url}name={encoded_name}&citystatezip={encoded_address}"
-        self.log.info(f"Url: {full_url}")
-        response = self.proxied_request(full_url)
+        self.log.debug(f"Url: {full_url}")
+        response = await self.proxied_request_async(full_url)
         if response.status_code != 200:
             raise Exception(f"Status_code: {response.status_code}, Text: {response.text}")
         return response.text
         
+    @profiler.stage("parse")
     def get_links_of_all_results(self, result):
-        soup = BeautifulSoup(result, 'html.parser')
-        names = soup.find_all('div', class_='card-summary')
-        self.log.info(f"Got {len(names)} entries for the search")
-        return [self.BASE_URL+name.get("data-detail-link") for name in names]
-
-    def get_emails(self, soup: BeautifulSoup):
-        emails = []
-        slots = soup.find_all(class_='row pl-md-1')
-        for slot in slots:
-            if "Email Addresses" in slot.get_text():
-                emails= [email.text.strip() for email in slot.find_all(class_="col")]
-                break
-        allowed_domains = [
-            "@yahoo.com",
-            "@hotmail.com",
-            "@gmail.com",
-            "@aol.com",
-            "@msn.com",
-            "@outlook.com",
-            "@live.com"
-        ]
-        return [email for email in emails if any(domain in email for domain in allowed_domains)]
+        with metrics.timer("parse"):
+            links = tps_extract.detail_links(result, self.BASE_URL)
+        self.log.debug(f"Got {len(links)} entries for the search")
+        return links
+
+    def get_emails(self, record: tps_extract.ProfileRecord):
+        return record.emails
     
-    def compare_addresses(self, address1, address2):
-        similarity_score = fuzz.partial_ratio(address1.lower(), address2.lower())
-        self.log.info(f"Matched addesses ({address1} | AND | {address2}) and got similarity score of {similarity_score}")
-        return similarity_score >=90
-
-    @retry(max_retry_count=3, interval_sec=5)
-    def get_emails_after_verifying_address(self, url, source_address):
-        response = self.proxied_request(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        addresses = soup.find_all(lambda tag: tag.get('data-link-to-more') == 'address')
-        for address in addresses:
-            address = address.find_all('span')
-            address = " ".join([add.text for add in address])
-            if self.compare_addresses(address, source_address):
-                emails = self.get_emails(soup)
-                return emails
-        return None
+    @retry(RetryPolicy(max_attempts=3, base_delay=2, max_delay=30))
+    async def get_emails_after_verifying_address(self, url, source_address):
+        response = await self.proxied_request_async(url)
+        # Parse off the event loop so other in-flight fetches keep moving
+        return await asyncio.to_thread(self.get_emails_if_address_matches, response.text, source_address)
 
-    def truepeoplesearch_manager(self, name, address):
-        result = self.get_pople_search_result(name, address)
-        links = self.get_links_of_all_results(result)
-        for link in links:
-            emails = self.get_emails_after_verifying_address(link, address)
-            if emails:
-                self.log.info(f"Got emails {emails}")
-                return emails
+    @profiler.stage("parse")
+    def get_emails_if_address_matches(self, html, source_address):
+        with metrics.timer("parse"):
+            record = tps_extract.extract_profile(html)
+            addresses = record.addresses
+        with metrics.timer("compare_addresses"):
+            matcher = matcher_for(source_address)
+            # Same city/state/ZIP5 after normalization is a match without any fuzzy scoring
+            index = matcher.exact_match(record.address_parts)
+            if index is None:
+                index = matcher.first_match(addresses)
+        if index is None:
+            self.log.debug(f"None of {len(addresses)} addresses matched ({source_address})")
+            return None
+        self.log.debug(f"Matched addesses ({addresses[index]} | AND | {source_address})")
+        with metrics.timer("parse"):
+            emails = self.get_emails(record)
+        return emails
+
+    async def get_first_verified_emails(self, links, address):
+        # Fetch DETAIL_FANOUT detail pages at once, but return the match that ranks first in the
+        # search results, as the one-by-one loop did: a match cancels only the pages ranked below it
+        err = None
+        for start in range(0, len(links), self.DETAIL_FANOUT):
+            tasks = [
+                asyncio.create_task(self.get_emails_after_verifying_address(link, address))
+                for link in links[start:start + self.DETAIL_FANOUT]
+            ]
+            try:
+                best = None
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.cancelled():
+                            continue
+                        if task.exception() is not None:
+                            err = err or task.exception()
+                            continue
+                        index = tasks.index(task)
+                        if task.result() and (best is None or index < best):
+                            best = index
+                            for later in tasks[index + 1:]:
+                                later.cancel()
+                    if best is not None and all(task.done() for task in tasks[:best]):
+                        return tasks[best].result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        if err:
+            raise err
+        return []
+
+    async def truepeoplesearch_manager_async(self, name, address):
+        result = await self.get_pople_search_result(name, address)
+        links = await asyncio.to_thread(self.get_links_of_all_results, result)
+        emails = await self.get_first_verified_emails(links, address)
+        if emails:
+            self.log.info(f"Got emails {emails}")
+            return emails
         self.log.error("Got no emails.")
         return []
 
-def process_row(row, result_excel_file_path, log: logging):
+    def truepeoplesearch_manager(self, name, address):
+        return proxy_session.run(self.truepeoplesearch_manager_async(name, address))
+
+async def search_city(row, city, dist, log: logging):
+    truepeoplesearch = Truepeoplesearch(
+        first_name=row["FIRST_NAME"],
+        last_name=row["LAST_NAME"],
+        street=row["STREET"],
+        city=city,
+        dist=dist,
+        zip=str(row["ZIP"]),
+        log=log
+    )
+    address = " ".join([city, dist, str(row["ZIP"])])
+    emails = await truepeoplesearch.truepeoplesearch_manager_async(
+        name=" ".join([row["FIRST_NAME"], row["LAST_NAME"]]), 
+        address=address)
+    # The first-token name variant only runs when the full name found nothing
+    if not emails:
+        emails = await truepeoplesearch.truepeoplesearch_manager_async(
+            name=" ".join([row["FIRST_NAME"].split(" ")[0], row["LAST_NAME"]]), 
+            address=address)
+    return emails
+
+
+async def search_cities(row, places, log: logging):
+    # Each city is an independent search chain, so all of them run at once
+    return await asyncio.gather(
+        *[search_city(row, city, dist, log) for city, dist in places],
+        return_exceptions=True
+    )
+
+
+def zip_key(row):
+    return zip5(row["ZIP"]) or str(row["ZIP"]).strip()
+
+
+def person_key(row):
+    first_name = " ".join(str(row["FIRST_NAME"]).upper().split())
+    last_name = " ".join(str(row["LAST_NAME"]).upper().split())
+    return (first_name, last_name, zip_key(row))
+
+
+def resolve_places(zip, log: logging):
+    usps = Usps(zip=zip, log=log)
+    cities = usps.get_city_from_zipcode()
+    places = []
+    for city in cities:
+        city = city.split(" ")
+        places.append((' '.join(city[:-1]), city[-1]))
+    return places
+
+
+def search_person(row, log: logging):
+    places = zip_lookups.run(zip_key(row), resolve_places, row["ZIP"], log)
+    results = proxy_session.run(search_cities(row, places, log))
+    return places, results
+
+
+@profiler.row
+def scrape_row(row, log: logging):
     rows = []
     try:
-        log.info(f"Scraping for: {row}")
-        usps = Usps(zip=row["ZIP"], log=log)
-        cities = usps.get_city_from_zipcode()
-        for city in cities:
-            city = city.split(" ")
-            city, dist = ' '.join(city[:-1]), city[-1]
-            truepeoplesearch = Truepeoplesearch(
-                first_name=row["FIRST_NAME"],
-                last_name=row["LAST_NAME"],
-                street=row["STREET"],
-                city=city,
-                dist=dist,
-                zip=str(row["ZIP"]),
-                log=log
-            )
-            emails = truepeoplesearch.truepeoplesearch_manager(
-                name=" ".join([row["FIRST_NAME"], row["LAST_NAME"]]), 
-                address=" ".join([city, dist, str(row["ZIP"])]))
-            if not emails:
-                emails = truepeoplesearch.truepeoplesearch_manager(
-                name=" ".join([row["FIRST_NAME"].split(" ")[0], row["LAST_NAME"]]), 
-                address=" ".join([city, dist, str(row["ZIP"])]))
-            new_row = {
+        log.debug(f"Scraping for: {row}")
+        # Rows naming the same person in the same ZIP share one search; each still gets its own output rows
+        places, results = person_searches.run(person_key(row), search_person, row, log)
+    except:
+        new_row = {
+            "FIRST_NAME": row["FIRST_NAME"],
+            "LAST_NAME": row["LAST_NAME"],
+            "STREET": row["STREET"],
+            "CITY": '',
+            "DIST": '',
+            "ZIP": row["ZIP"],
+            "EMAIL": [],
+            "STATUS": "ERROR"
+        }
+        rows.append(new_row)
+        return rows
+
+    for (city, dist), emails in zip(places, results):
+        failed = isinstance(emails, Exception)
+        if failed:
+            log.error(f"Search failed for {city} {dist}: {emails}")
+        new_row = {
             "FIRST_NAME": row["FIRST_NAME"],
             "LAST_NAME": row["LAST_NAME"],
             "STREET": row["STREET"],
             "CITY": city,
             "DIST": dist,
             "ZIP": row["ZIP"],
-            "EMAIL": emails,
-            "STATUS": 'SUCCESS'
+            "EMAIL": [] if failed else emails,
+            "STATUS": "ERROR" if failed else 'SUCCESS'
         }
-            rows.append(new_row)
-    except:
-        try:
-            new_row = {
-                "FIRST_NAME": row["FIRST_NAME"],
-                "LAST_NAME": row["LAST_NAME"],
-                "STREET": row["STREET"],
-                "CITY": city,
-                "DIST": dist,
-                "ZIP": row["ZIP"],
-                "EMAIL": [],
-                "STATUS": "ERROR"
-            }
-        except:
-            new_row = {
-                "FIRST_NAME": row["FIRST_NAME"],
-                "LAST_NAME": row["LAST_NAME"],
-                "STREET": row["STREET"],
-                "CITY": '',
-                "DIST": '',
-                "ZIP": row["ZIP"],
-                "EMAIL": [],
-                "STATUS": "ERROR"
-            }
-
         rows.append(new_row)
-    df = pd.DataFrame(rows)
-    if os.path.exists(result_excel_file_path):
-        existing_df = pd.read_excel(
-            result_excel_file_path, names=["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP", "EMAIL", "STATUS"], engine="openpyxl"
-        )
-        existing_df = pd.concat([existing_df, df], ignore_index=True)
-        df = existing_df
-    else:
-        with open(result_excel_file_path, "w"):
-            pass
-
-    df = df.explode("EMAIL", ignore_index=True)
-    duplicated_rows = df.duplicated(subset=["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP", "STATUS"])
-    df.loc[duplicated_rows, ["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP", "STATUS"]] = ""
-    log.info(f"Saved to excel: {result_excel_file_path}")
-
-    return df
\ No newline at end of file
+    return rows
+
+
+def process_row(row, sink: JsonlResultSink, log: logging):
+    rows = scrape_row(row, log)
+    sink.write(rows)
+    log.debug(f"Saved to result journal: {sink.path}")
+
+    return rows
\ No newline at end of file
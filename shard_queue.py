@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+
+import scraper
+from batch import read_source, run_batch, run_stats
+from cli import ProgressPrinter, add_runtime_options, configure, get_logger
+from metrics import metrics
+from profiling import profiler
+from result_sink import JsonlResultSink, journal_path_for, rows_to_dataframe
+
+
+def spool_dir_for(result_excel_file_path):
+    base_path, _ = os.path.splitext(result_excel_file_path)
+    return f"{base_path}.shards"
+
+
+class ShardQueue:
+    """Row shards of one source workbook in a SQLite file that any number of worker processes claim from.
+
+    A claim is a lease: the worker heartbeats while it runs the shard, and a shard whose heartbeat
+    is older than lease_sec goes back to the queue. Each shard writes its own result and run
+    journals in the spool directory, so a reclaimed shard resumes where the dead worker stopped.
+    SQLite locking needs a local disk; several hosts should share the queue through a single
+    host's disk only if it is not NFS.
+    """
+
+    def __init__(self, path, lease_sec=600) -> None:
+        self.path = path
+        self.lease_sec = lease_sec
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS shards ("
+            "id INTEGER PRIMARY KEY, start_row INTEGER NOT NULL, end_row INTEGER NOT NULL, "
+            "status TEXT NOT NULL, worker TEXT, heartbeat REAL, attempts INTEGER NOT NULL DEFAULT 0, error TEXT)"
+        )
+
+    def meta(self):
+        return {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM meta")}
+
+    def init(self, source, dest, total_rows, shard_size, header=True):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.conn.execute("SELECT COUNT(*) FROM shards").fetchone()[0]:
+                    raise ValueError(f"{self.path} already holds shards")
+                values = {"source": source, "dest": dest, "header": header, "total_rows": total_rows,
+                          "shard_size": shard_size}
+                self.conn.executemany(
+                    "INSERT INTO meta (key, value) VALUES (?, ?)",
+                    [(key, json.dumps(value)) for key, value in values.items()],
+                )
+                self.conn.executemany(
+                    "INSERT INTO shards (id, start_row, end_row, status) VALUES (?, ?, ?, 'pending')",
+                    [
+                        (number, start, min(start + shard_size, total_rows))
+                        for number, start in enumerate(range(0, total_rows, shard_size))
+                    ],
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, worker):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                found = self.conn.execute(
+                    "SELECT id, start_row, end_row FROM shards "
+                    "WHERE status = 'pending' OR (status = 'claimed' AND heartbeat < ?) ORDER BY id LIMIT 1",
+                    (now - self.lease_sec,),
+                ).fetchone()
+                if found is not None:
+                    self.conn.execute(
+                        "UPDATE shards SET status = 'claimed', worker = ?, heartbeat = ?, attempts = attempts + 1 "
+                        "WHERE id = ?",
+                        (worker, now, found[0]),
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return found
+
+    def heartbeat(self, shard_id, worker):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE shards SET heartbeat = ? WHERE id = ? AND worker = ? AND status = 'claimed'",
+                (time.time(), shard_id, worker),
+            )
+
+    def finish(self, shard_id, worker, error=None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE shards SET status = ?, error = ?, heartbeat = ? WHERE id = ? AND worker = ?",
+                ("failed" if error else "done", error, time.time(), shard_id, worker),
+            )
+
+    def release_failed(self):
+        with self.lock:
+            return self.conn.execute("UPDATE shards SET status = 'pending' WHERE status = 'failed'").rowcount
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status"))
+
+    def shard_ids(self):
+        return [shard_id for shard_id, in self.conn.execute("SELECT id FROM shards ORDER BY id")]
+
+    def close(self):
+        self.conn.close()
+
+
+def shard_dest(dest, shard_id):
+    return os.path.join(spool_dir_for(dest), f"shard-{shard_id:05d}.xlsx")
+
+
+def work(queue: ShardQueue, args, log, progress):
+    meta = queue.meta()
+    worker = args.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    os.makedirs(spool_dir_for(meta["dest"]), exist_ok=True)
+    while True:
+        claimed = queue.claim(worker)
+        if claimed is None:
+            return
+        shard_id, start_row, end_row = claimed
+        progress.emit("shard_claimed", shard=shard_id, start=start_row, end=end_row, worker=worker)
+        stop = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(queue.lease_sec / 3):
+                queue.heartbeat(shard_id, worker)
+
+        threading.Thread(target=keep_alive, daemon=True).start()
+        try:
+            source = read_source(meta["source"], header=meta["header"], start=start_row, stop=end_row)
+            run_batch(source, shard_dest(meta["dest"], shard_id), log,
+                      args.workers, not args.no_retry_errors, progress)
+            queue.finish(shard_id, worker)
+            progress.emit("shard_done", shard=shard_id, worker=worker)
+        except Exception as e:
+            log.error(traceback.format_exc())
+            queue.finish(shard_id, worker, error=str(e))
+            progress.emit("shard_failed", shard=shard_id, worker=worker, message=str(e))
+        finally:
+            stop.set()
+
+
+def merge(queue: ShardQueue):
+    meta = queue.meta()
+    counts = queue.counts()
+    if set(counts) - {"done"}:
+        raise RuntimeError(f"Not every shard is done yet: {counts}")
+    rows = []
+    for shard_id in queue.shard_ids():
+        rows.extend(JsonlResultSink(journal_path_for(shard_dest(meta["dest"], shard_id))).read())
+    rows_to_dataframe(rows).to_excel(meta["dest"], index=False)
+    return meta["dest"]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Sharded Truepeoplesearch scraping over a shared SQLite work queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = commands.add_parser("init", help="Split a source workbook into shards")
+    init_parser.add_argument("queue", help="Queue file shared by the workers")
+    init_parser.add_argument("source")
+    init_parser.add_argument("dest")
+    init_parser.add_argument("--shard-size", type=int, default=500)
+    init_parser.add_argument("--no-header", action="store_true")
+
+    work_parser = commands.add_parser("work", help="Claim and scrape shards until none are left")
+    work_parser.add_argument("queue")
+    work_parser.add_argument("--worker-id", default=None)
+    work_parser.add_argument("--lease-sec", type=float, default=600)
+    add_runtime_options(work_parser)
+
+    for name, help in (("merge", "Build the destination workbook from finished shards"),
+                       ("status", "Print shard counts by status"),
+                       ("retry-failed", "Put failed shards back in the queue")):
+        command_parser = commands.add_parser(name, help=help)
+        command_parser.add_argument("queue")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    queue = ShardQueue(args.queue, lease_sec=getattr(args, "lease_sec", 600))
+    try:
+        if args.command == "init":
+            total_rows = len(read_source(args.source, header=not args.no_header))
+            queue.init(args.source, args.dest, total_rows, args.shard_size, header=not args.no_header)
+            print(json.dumps({"event": "init", "total_rows": total_rows, "shards": queue.counts()}))
+        elif args.command == "work":
+            log = get_logger(args.log_file, args.log_level, args.log_sample_every)
+            configure(args)
+            progress = ProgressPrinter(args.progress)
+            try:
+                work(queue, args, log, progress)
+            finally:
+                scraper.driver_pool.close()
+                scraper.proxy_session.close()
+                if args.metrics_file:
+                    metrics.write(args.metrics_file)
+                profile_path = profiler.finish()
+                if profile_path:
+                    progress.emit("profile", path=profile_path)
+            progress.emit("worker_done", shards=queue.counts(), stats=run_stats())
+        elif args.command == "merge":
+            print(json.dumps({"event": "merged", "dest": merge(queue)}))
+        elif args.command == "status":
+            print(json.dumps({"event": "status", "shards": queue.counts()}))
+        elif args.command == "retry-failed":
+            print(json.dumps({"event": "released", "shards": queue.release_failed()}))
+        return 0
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Saves a live Truepeoplesearch result page and its first detail pages, anonymized, as parity
+fixtures under tests/fixtures/saved/, where test_tps_extract.py picks them up.
+
+    python tests/capture_fixture.py "John Smith" "Springfield, IL 62704" --details 3 --replace "Elm St=Test St"
+
+Pages go through the ScrapeOps proxy with the key in credentials.py (1 credit a page). Emails keep
+their domain, phone numbers, person ids and the searched name are replaced; pass --replace for
+anything else that identifies someone (streets, relatives) and read the files before committing.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sys
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper
+import tps_extract
+
+SAVED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "saved")
+EMAIL = re.compile(r"[\w.+-]+@((?:[\w-]+\.)+[A-Za-z]{2,})")
+PHONE = re.compile(r"\(?\b\d{3}\)?[ .-]?\d{3}-\d{4}\b")
+PERSON_ID = re.compile(r"/find/person/p[0-9a-z]+", re.IGNORECASE)
+STAND_IN_NAMES = ["Alex", "Doe", "Quinn", "Roe"]
+
+
+class Anonymizer:
+    def __init__(self, name, replacements) -> None:
+        self.replacements = list(replacements)
+        for token, stand_in in zip(name.split(), STAND_IN_NAMES):
+            self.replacements.append((token, stand_in))
+        self.seen = {}
+
+    def stand_in(self, kind, value, make):
+        key = (kind, value.lower())
+        if key not in self.seen:
+            self.seen[key] = make(len([seen for seen in self.seen if seen[0] == kind]))
+        return self.seen[key]
+
+    def __call__(self, html):
+        html = EMAIL.sub(lambda m: self.stand_in("email", m.group(0), lambda n: f"person{n}@{m.group(1)}"), html)
+        html = PHONE.sub(lambda m: self.stand_in("phone", m.group(0), lambda n: f"(555) 555-{n:04d}"), html)
+        html = PERSON_ID.sub(lambda m: self.stand_in(
+            "person", m.group(0), lambda n: f"/find/person/p{hashlib.md5(str(n).encode()).hexdigest()[:12]}"), html)
+        for old, new in self.replacements:
+            html = re.sub(rf"\b{re.escape(old)}\b", lambda m: new.upper() if m.group(0).isupper() else new, html,
+                          flags=re.IGNORECASE)
+        return html
+
+
+def next_capture(directory):
+    taken = [int(m.group(1)) for name in os.listdir(directory) if (m := re.match(r"capture(\d+)-", name))]
+    return max(taken, default=0) + 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Save anonymized Truepeoplesearch pages as test fixtures")
+    parser.add_argument("name")
+    parser.add_argument("citystatezip")
+    parser.add_argument("--details", type=int, default=2, help="Detail pages to save from the top of the results")
+    parser.add_argument("--replace", action="append", default=[], metavar="OLD=NEW",
+                        help="Extra text to replace, e.g. a street or a relative's name")
+    args = parser.parse_args(argv)
+    anonymize = Anonymizer(args.name, [pair.split("=", 1) for pair in args.replace])
+    site = scraper.Truepeoplesearch(logging.getLogger("capture"))
+    os.makedirs(SAVED_DIR, exist_ok=True)
+    capture = next_capture(SAVED_DIR)
+
+    query = urllib.parse.urlencode({"name": args.name, "citystatezip": args.citystatezip}, quote_via=urllib.parse.quote)
+    search_html = site.proxied_request(f"{site.BASE_URL}/results?{query}").text
+    pages = [("search", search_html)]
+    for index, link in enumerate(tps_extract.detail_links(search_html, site.BASE_URL)[:args.details]):
+        pages.append((f"detail{index}", site.proxied_request(link).text))
+    try:
+        for kind, html in pages:
+            path = os.path.join(SAVED_DIR, f"capture{capture}-{kind}.html")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(anonymize(html))
+            print(path)
+    finally:
+        scraper.proxy_session.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""AddressMatcher must make the same accept/reject decisions as the original
+fuzz.partial_ratio(candidate.lower(), source.lower()) >= 90 check, which its rapidfuzz prefilter
+relies on never scoring below fuzzywuzzy."""
+import random
+import string
+
+import pytest
+from fuzzywuzzy import fuzz
+
+from address_match import MATCH_THRESHOLD, AddressMatcher
+
+STREETS = ["1428 Elm St", "88 N Grand Ave Apt 3", "9 Oak Ln", "510 W Walnut St", "12000 Southwest Fwy Ste 210",
+           "3 Rue De La Paix", "77 Saint Marys Rd", "4501 County Road 12"]
+PLACES = [("Springfield", "IL", "62704"), ("Chatham", "IL", "62629"), ("New York", "NY", "10001"),
+          ("Saint Louis", "MO", "63101"), ("St Louis", "MO", "63103"), ("Fort Worth", "TX", "76102"),
+          ("Ft Worth", "TX", "76104"), ("Los Angeles", "CA", "90012"), ("Springfield", "MO", "65806")]
+SOURCES = [f"{city} {state} {zip}" for city, state, zip in PLACES]
+# Candidates the way a detail page joins its address spans
+REAL_CANDIDATES = [f"{street} {city} {state} {zip}" for street in STREETS for city, state, zip in PLACES] + [
+    "1428 Elm St Springfeld IL 62704",
+    "1428 Elm St Springfield Il 62704-1234",
+    "1428 Elm St SPRINGFIELD IL",
+    "Springfield IL 6270",
+    "PO Box 12 Chatham IL 62629",
+    "88 N Grand Ave Apt 3 Springfield  IL 62702",
+    "New York City NY 10001",
+    "",
+]
+
+
+def baseline_accepts(candidate, source):
+    return fuzz.partial_ratio(candidate.lower(), source.lower()) >= MATCH_THRESHOLD
+
+
+def mutate(text, rng):
+    """Typos, dropped and doubled characters, case changes, truncation and padding."""
+    chars = list(text)
+    for _ in range(rng.randint(0, 4)):
+        if not chars:
+            break
+        position = rng.randrange(len(chars))
+        action = rng.randrange(5)
+        if action == 0:
+            chars[position] = rng.choice(string.ascii_letters + string.digits + " ")
+        elif action == 1:
+            del chars[position]
+        elif action == 2:
+            chars.insert(position, chars[position])
+        elif action == 3:
+            chars[position] = chars[position].swapcase()
+        elif position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+    text = "".join(chars)
+    roll = rng.random()
+    if roll < 0.15:
+        text = text[rng.randrange(len(text) + 1):]
+    elif roll < 0.3:
+        text = text[:rng.randrange(len(text) + 1)]
+    elif roll < 0.45:
+        text = f"{rng.choice(STREETS)} {text}"
+    return text
+
+
+def generated_corpus(seed, size):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        source = rng.choice(SOURCES)
+        # Mostly variants of the source itself, so many pairs land near the threshold
+        base = source if rng.random() < 0.7 else rng.choice(SOURCES)
+        candidates = [mutate(rng.choice([base, f"{rng.choice(STREETS)} {base}"]), rng) for _ in range(rng.randint(1, 6))]
+        corpus.append((source, candidates))
+    return corpus
+
+
+def expected_first(candidates, source):
+    return next((index for index, candidate in enumerate(candidates) if baseline_accepts(candidate, source)), None)
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_real_addresses_agree_with_baseline(source):
+    matcher = AddressMatcher(source)
+    for candidate in REAL_CANDIDATES:
+        assert matcher.accepts(candidate) == baseline_accepts(candidate, source), (candidate, source)
+    assert matcher.first_match(REAL_CANDIDATES) == expected_first(REAL_CANDIDATES, source)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_generated_corpus_agrees_with_baseline(seed):
+    near_threshold = 0
+    for source, candidates in generated_corpus(seed, 1500):
+        matcher = AddressMatcher(source)
+        for candidate in candidates:
+            accepted = baseline_accepts(candidate, source)
+            assert matcher.accepts(candidate) == accepted, (candidate, source)
+            near_threshold += abs(fuzz.partial_ratio(candidate.lower(), source.lower()) - MATCH_THRESHOLD) <= 5
+        first = expected_first(candidates, source)
+        assert matcher.first_match(candidates) == first, (candidates, source)
+    # The corpus is only a useful check if plenty of pairs sit close to the threshold
+    assert near_threshold > 500
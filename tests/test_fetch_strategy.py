@@ -0,0 +1,53 @@
+"""render_js escalation: only positive signs of a challenge page count as blocked."""
+import os
+
+import pytest
+
+from fetch_strategy import FetchStrategy, looks_blocked
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SEARCH_URL = "https://www.truepeoplesearch.com/results?name=John%20Smith&citystatezip=Springfield%20IL"
+DETAIL_URL = "https://www.truepeoplesearch.com/find/person/px1a2b3c4d5e6f"
+# Valid pages in markup the extractor has never seen: no card-summary, data-link-to-more or known
+# no-results wording
+UNFAMILIAR_SEARCH = ("<html><body><main><h1>Results for John Smith</h1>"
+                     + "<article class='person-result'><a href='/p/1'>John Smith, 54</a></article>" * 8
+                     + "</main></body></html>")
+UNFAMILIAR_EMPTY_SEARCH = "<html><body><main><p>Sorry, nobody by that name turned up near Springfield, IL.</p>" + \
+    "<nav>" + "<a href='/help'>Help</a>" * 30 + "</nav></main></body></html>"
+UNFAMILIAR_DETAIL = ("<html><body><section id='profile'><h1>John A Smith</h1>"
+                     + "<ul class='addresses'><li>1428 Elm St, Springfield, IL 62704</li></ul>" * 8
+                     + "</section></body></html>")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("html", [UNFAMILIAR_SEARCH, UNFAMILIAR_EMPTY_SEARCH, UNFAMILIAR_DETAIL,
+                                  fixture("synthetic_search.html"), fixture("synthetic_detail.html")],
+                         ids=["search", "empty_search", "detail", "synthetic_search", "synthetic_detail"])
+def test_valid_pages_are_not_escalated(html):
+    assert len(html) >= 512
+    assert not looks_blocked(html)
+
+
+@pytest.mark.parametrize("html, status_code", [
+    ("", 200),
+    ("<html><body>Just a moment...</body></html>", 200),
+    (UNFAMILIAR_DETAIL.replace("</section>", "<div class='g-recaptcha'></div></section>"), 200),
+    (UNFAMILIAR_SEARCH.replace("<main>", "<form id='challenge-form'></form><main>"), 200),
+    (UNFAMILIAR_SEARCH, 403),
+], ids=["empty", "just_a_moment", "recaptcha", "challenge_form", "status_403"])
+def test_challenge_pages_are_escalated(html, status_code):
+    assert looks_blocked(html, status_code)
+
+
+def test_unfamiliar_pages_do_not_train_prerendering():
+    strategy = FetchStrategy(min_samples=10, prerender_ratio=0.8)
+    for index in range(50):
+        for url, html in [(f"{SEARCH_URL}{index}", UNFAMILIAR_EMPTY_SEARCH), (f"{DETAIL_URL}{index}", UNFAMILIAR_DETAIL)]:
+            assert not strategy.should_prerender(url)
+            strategy.record(url, False, looks_blocked(html))
+    assert all(stats["plain_blocked"] == 0 for stats in strategy.stats().values())
@@ -0,0 +1,102 @@
+"""Credit accounting of ProxyGovernor.slot: requests that may have reached the provider stay spent."""
+import asyncio
+
+import httpx
+import pytest
+
+from metrics import metrics
+from rate_limiter import CREDIT_COST, BudgetExhausted, ProxyGovernor
+from retry_policy import ProxyRequestError
+
+DETAIL_URL = "https://www.truepeoplesearch.com/find/person/px1"
+SEARCH_URL = "https://www.truepeoplesearch.com/results?name=a"
+
+
+async def request(governor, url=DETAIL_URL, render_js=False, sent=None, error=None):
+    async with governor.slot(url, render_js):
+        if sent is not None:
+            sent.append(url)
+        if error is not None:
+            raise error
+        await asyncio.sleep(10)
+
+
+async def cancel_in_flight(governor, count, render_js=False):
+    sent = []
+    tasks = [asyncio.create_task(request(governor, render_js=render_js, sent=sent)) for _ in range(count)]
+    while len(sent) < count:
+        await asyncio.sleep(0.01)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_cancelled_in_flight_requests_stay_spent():
+    governor = ProxyGovernor(requests_per_sec=1000, max_in_flight=10, credit_budget=100)
+    asyncio.run(cancel_in_flight(governor, 4, render_js=True))
+    assert governor.credits_used == 4 * CREDIT_COST[True]
+    assert governor.credits_reserved == 0
+    assert governor.in_flight == 0
+
+
+def test_cancelled_requests_count_against_the_budget():
+    governor = ProxyGovernor(requests_per_sec=1000, max_in_flight=20, credit_budget=10)
+
+    async def run():
+        await cancel_in_flight(governor, 8)
+        # Only 2 credits left; search pages keep going in the low-budget band, detail pages do not
+        await cancel_in_flight(governor, 2)
+        with pytest.raises(BudgetExhausted):
+            await request(governor, SEARCH_URL, error=RuntimeError("unreachable"))
+
+    asyncio.run(run())
+    assert governor.credits_used == 10
+    assert governor.credits_remaining() == 0
+
+
+def test_requests_cancelled_before_sending_are_refunded():
+    governor = ProxyGovernor(requests_per_sec=1000, max_in_flight=1, credit_budget=100)
+
+    async def run():
+        sent = []
+        tasks = [asyncio.create_task(request(governor, sent=sent)) for _ in range(3)]
+        while not sent:
+            await asyncio.sleep(0.01)
+        # One holds the only in-flight slot; the other two are still waiting for it
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return sent
+
+    assert len(asyncio.run(run())) == 1
+    assert governor.credits_used == 1
+    assert governor.credits_reserved == 0
+
+
+@pytest.mark.parametrize("error, spent", [
+    (ProxyRequestError("Proxied request failed. 500.", status_code=500), 0),
+    (httpx.ConnectError("refused"), 0),
+    (httpx.ReadTimeout("no answer"), 1),
+])
+def test_failures_refund_only_unbilled_requests(error, spent):
+    governor = ProxyGovernor(requests_per_sec=1000, credit_budget=100)
+    with pytest.raises(type(error)):
+        asyncio.run(request(governor, error=error))
+    assert governor.credits_used == spent
+    assert governor.credits_reserved == 0
+
+
+def test_metrics_count_every_sent_request():
+    governor = ProxyGovernor(requests_per_sec=1000, max_in_flight=10)
+    metrics.reset()
+
+    async def run():
+        await cancel_in_flight(governor, 3)
+        with pytest.raises(ProxyRequestError):
+            await request(governor, error=ProxyRequestError("Proxied request failed. 429.", status_code=429))
+
+    asyncio.run(run())
+    counters = metrics.snapshot()["counters"]
+    assert counters["proxy_requests"] == 4
+    assert counters["proxy_cancelled"] == 3
+    assert counters["credits"] - counters["credits_refunded"] == governor.credits_used == 3
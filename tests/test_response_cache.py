@@ -0,0 +1,45 @@
+"""Credits saved by response cache hits follow the cost of the fetch that filled each entry."""
+import sqlite3
+
+from rate_limiter import CREDIT_COST
+from response_cache import ResponseCache
+
+PLAIN_URL = "https://www.truepeoplesearch.com/results?name=a&citystatezip=b"
+RENDERED_URL = "https://www.truepeoplesearch.com/find/person/px1"
+
+
+def test_hits_save_the_cost_of_their_fetch(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path)
+    cache.set(PLAIN_URL, "plain page", CREDIT_COST[False])
+    cache.set(RENDERED_URL, "rendered page", CREDIT_COST[True])
+    assert cache.get(PLAIN_URL) == "plain page"
+    assert cache.get(RENDERED_URL) == "rendered page"
+    assert cache.stats()["credits_saved"] == 11
+
+    # A fresh process reads both back from disk with their costs
+    reopened = ResponseCache(path)
+    assert reopened.get(RENDERED_URL) == "rendered page"
+    assert reopened.get(RENDERED_URL) == "rendered page"
+    assert reopened.get(PLAIN_URL) == "plain page"
+    assert reopened.get("https://www.truepeoplesearch.com/find/person/px2") is None
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["credits_saved"] == 21
+
+
+def test_caches_without_costs_count_one_credit_a_hit(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE responses (key TEXT PRIMARY KEY, body BLOB NOT NULL, compressed INTEGER NOT NULL, "
+        "size INTEGER NOT NULL, stored_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO responses VALUES (?, ?, 0, 4, strftime('%s', 'now'))",
+                 ("https://www.truepeoplesearch.com/find/person/px1", b"page"))
+    conn.commit()
+    conn.close()
+    cache = ResponseCache(path)
+    assert cache.get(RENDERED_URL) == "page"
+    cache.set(PLAIN_URL, "plain page")
+    assert cache.stats()["credits_saved"] == 1
@@ -0,0 +1,109 @@
+"""Parity of tps_extract with the BeautifulSoup parsing it replaced.
+
+Runs on the synthetic pages in fixtures/ and on every anonymized live page saved under
+fixtures/saved/ by capture_fixture.py (capture<N>-search.html, capture<N>-detail<i>.html).
+"""
+import glob
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+import tps_extract
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+BASE_URL = "https://www.truepeoplesearch.com"
+SEARCH_PAGES = sorted(glob.glob(os.path.join(FIXTURES, "**", "*search*.html"), recursive=True))
+DETAIL_PAGES = sorted(glob.glob(os.path.join(FIXTURES, "**", "*detail*.html"), recursive=True))
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return file.read()
+
+
+# The original Truepeoplesearch parsing, kept as the reference
+
+def baseline_detail_links(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    names = soup.find_all('div', class_='card-summary')
+    return [BASE_URL + name.get("data-detail-link") for name in names]
+
+
+def baseline_addresses(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    addresses = soup.find_all(lambda tag: tag.get('data-link-to-more') == 'address')
+    return [" ".join([add.text for add in address.find_all('span')]) for address in addresses]
+
+
+def baseline_emails(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    emails = []
+    for slot in soup.find_all(class_='row pl-md-1'):
+        if "Email Addresses" in slot.get_text():
+            emails = [email.text.strip() for email in slot.find_all(class_="col")]
+            break
+    return [email for email in emails if any(domain in email for domain in tps_extract.ALLOWED_EMAIL_DOMAINS)]
+
+
+def page_id(path):
+    return os.path.relpath(path, FIXTURES)
+
+
+@pytest.mark.parametrize("path", SEARCH_PAGES, ids=page_id)
+def test_detail_links_match_baseline(path):
+    html = fixture(path)
+    assert tps_extract.detail_links(html, BASE_URL) == baseline_detail_links(html)
+
+
+def test_synthetic_search_page_values():
+    assert tps_extract.detail_links(fixture("synthetic_search.html"), BASE_URL) == [
+        BASE_URL + "/find/person/px1a2b3c4d5e6f",
+        BASE_URL + "/find/person/px9z8y7x6w5v4u?rid=0x1",
+        BASE_URL + "/find/person/px0p0q0r0s0t0u",
+        BASE_URL + "/find/person/pxM1N2B3V4C5X6&src=srp",
+    ]
+
+
+@pytest.mark.parametrize("path", DETAIL_PAGES, ids=page_id)
+def test_addresses_match_baseline(path):
+    html = fixture(path)
+    assert tps_extract.extract_profile(html).addresses == baseline_addresses(html)
+
+
+@pytest.mark.parametrize("path", DETAIL_PAGES, ids=page_id)
+def test_emails_match_baseline(path):
+    html = fixture(path)
+    assert tps_extract.extract_profile(html).emails == baseline_emails(html)
+
+
+def test_synthetic_detail_page_values():
+    profile = tps_extract.extract_profile(fixture("synthetic_detail.html"))
+    assert profile.address_parts == [
+        ("1428 Elm St", "Springfield", "IL", "62704"),
+        ("88 N Grand Ave Apt 3", "Springfield", "IL", "62702"),
+        ("9 Oak Ln", "Chatham", "IL", "62629"),
+    ]
+    assert profile.phones == ["(217) 555-0199"]
+    # Domain matching is case-sensitive, as it always was
+    assert profile.emails == ["jsmith1970@gmail.com", "j_smith@hotmail.com", "smithj@aol.com"]
+    assert tps_extract.extract_profile(fixture("synthetic_detail_no_emails.html")).emails == []
+
+
+def test_pages_with_an_xml_declaration_parse_like_baseline():
+    for name, check in [("synthetic_search.html", lambda html: tps_extract.detail_links(html, BASE_URL)),
+                        ("synthetic_detail.html", lambda html: tps_extract.extract_profile(html).emails)]:
+        html = fixture(name)
+        declared = '<?xml version="1.0" encoding="iso-8859-1"?>\n' + html.split("\n", 1)[1].replace("Elm", "Élm")
+        assert check(declared) == check(html)
+    declared = '<?xml version="1.0" encoding="utf-8"?>\n' + fixture("synthetic_detail.html").replace("Elm", "Élm")
+    assert tps_extract.extract_profile(declared).addresses == baseline_addresses(declared)
+    assert tps_extract.extract_profile(declared).addresses[0] == "1428 Élm St Springfield IL 62704"
+
+
+@pytest.mark.parametrize("html", ["", "   ", "<html><body>Just a moment...</body></html>"])
+def test_empty_and_blocked_pages(html):
+    assert tps_extract.detail_links(html, BASE_URL) == baseline_detail_links(html) == []
+    profile = tps_extract.extract_profile(html)
+    assert profile.addresses == baseline_addresses(html) == []
+    assert profile.emails == baseline_emails(html) == []
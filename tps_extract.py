@@ -0,0 +1,95 @@
+from functools import cached_property
+
+import lxml.html
+from lxml import etree
+
+ALLOWED_EMAIL_DOMAINS = [
+    "@yahoo.com",
+    "@hotmail.com",
+    "@gmail.com",
+    "@aol.com",
+    "@msn.com",
+    "@outlook.com",
+    "@live.com"
+]
+
+# Same matching rules as the BeautifulSoup calls these replace: class_='card-summary' and
+# class_='col' match one class token, class_='row pl-md-1' matches the whole attribute value.
+DETAIL_LINKS = etree.XPath(
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' card-summary ')]/@data-detail-link"
+)
+# Linked blocks and detail slots in one walk, in document order
+BLOCKS_AND_SLOTS = etree.XPath("//*[@data-link-to-more or @class='row pl-md-1']")
+SPANS = etree.XPath(".//span")
+COLUMNS = etree.XPath(".//*[contains(concat(' ', normalize-space(@class), ' '), ' col ')]")
+UTF8_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+
+def parse(html):
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml.html.fromstring(html)
+    except ValueError:
+        # lxml refuses a str that carries an XML encoding declaration; the text is already decoded
+        return parse_bytes(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+def parse_bytes(data):
+    try:
+        return lxml.html.fromstring(data, parser=UTF8_PARSER)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def detail_links(html, base_url):
+    tree = parse(html)
+    if tree is None:
+        return []
+    return [base_url + link for link in DETAIL_LINKS(tree)]
+
+
+class ProfileRecord:
+    """Everything a detail page links to more of (address, phone, ...) and its detail slots,
+    collected in one pass over the tree. Each entry keeps its span texts so callers can use the
+    parts or the joined string; emails only look inside the slots."""
+
+    def __init__(self, tree) -> None:
+        self.links = {}
+        self.slots = []
+        if tree is None:
+            return
+        for element in BLOCKS_AND_SLOTS(tree):
+            kind = element.get("data-link-to-more")
+            if kind is not None:
+                parts = tuple(span.text_content() for span in SPANS(element))
+                self.links.setdefault(kind, []).append(parts)
+            if element.get("class") == "row pl-md-1":
+                self.slots.append(element)
+
+    @property
+    def address_parts(self):
+        return self.links.get("address", [])
+
+    @property
+    def addresses(self):
+        return [" ".join(parts) for parts in self.address_parts]
+
+    @property
+    def phones(self):
+        return [" ".join(parts) for parts in self.links.get("phone", [])]
+
+    @cached_property
+    def emails(self):
+        found = []
+        for slot in self.slots:
+            if "Email Addresses" in slot.text_content():
+                found = [column.text_content().strip() for column in COLUMNS(slot)]
+                break
+        return [email for email in found if any(domain in email for domain in ALLOWED_EMAIL_DOMAINS)]
+
+
+def extract_profile(html):
+    return ProfileRecord(parse(html))
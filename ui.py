@@ -1,14 +1,19 @@
 import threading
-import openpyxl
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import traceback
-import pandas as pd
 import logging
-from scraper import process_row
+from scraper import driver_pool
+from batch import read_source, run_batch, run_stats
 import queue
+from log_pipeline import RingBufferHandler, start_logging
+from metrics import metrics
+from profiling import profiler
+import os
 
 class Logger(tk.Frame):
+    MAX_LINES = 2000
+
     def __init__(self, parent):
         super().__init__(parent)
         self.textbox = tk.Text(self, width=130, height=50, state="disabled")
@@ -20,8 +25,18 @@ class Logger(tk.Frame):
         self.scrollbar.pack(side="right", fill="y")
 
     def log_text(self, text: str, tag: str) -> None:
+        self.log_lines([(text, tag)])
+
+    def log_lines(self, lines) -> None:
+        if not lines:
+            return
         self.textbox.config(state="normal")
-        self.textbox.insert("end", f"{text}\n", tag)
+        for text, tag in lines:
+            self.textbox.insert("end", f"{text}\n", tag)
+        # Keep only the newest MAX_LINES lines in the widget
+        excess = int(self.textbox.index("end-1c").split(".")[0]) - 1 - self.MAX_LINES
+        if excess > 0:
+            self.textbox.delete("1.0", f"{excess + 1}.0")
         self.textbox.config(state="disabled")
         self.textbox.see(tk.END)
 
@@ -32,19 +47,6 @@ class Logger(tk.Frame):
         self.log_text(text, "error")
 
 
-class TextHandler(logging.Handler):
-    """A custom logging handler that sends log messages to a Tkinter Text widget."""
-
-    def __init__(self, logger_widget):
-        super().__init__()
-        self.logger_widget = logger_widget
-
-    def emit(self, record):
-        msg = self.format(record)
-        tag = "info" if record.levelno < logging.ERROR else "error"
-        self.logger_widget.log_text(msg, tag)
-
-
 class ExcelProcessorApp:
     def __init__(self, root):
         self.root = root
@@ -70,6 +72,27 @@ class ExcelProcessorApp:
         self.dest_button = tk.Button(root, text="Browse", command=self.browse_dest_file)
         self.dest_button.pack(pady=5)
 
+        # Number of rows scraped in parallel
+        self.workers_label = tk.Label(root, text="Parallel workers:")
+        self.workers_label.pack(pady=5)
+        self.workers_spinbox = tk.Spinbox(root, from_=1, to=32, width=5)
+        self.workers_spinbox.delete(0, tk.END)
+        self.workers_spinbox.insert(0, "4")
+        self.workers_spinbox.pack(pady=5)
+
+        # Rerun rows that ended in STATUS: ERROR when resuming into an existing destination
+        self.retry_errors = tk.BooleanVar(value=True)
+        self.retry_errors_check = tk.Checkbutton(root, text="Retry rows that ended in ERROR", variable=self.retry_errors)
+        self.retry_errors_check.pack(pady=5)
+
+        # Profile the first rows of the run; results go to profiles/<run id>/
+        self.profile_label = tk.Label(root, text="Profile the first 200 rows:")
+        self.profile_label.pack(pady=5)
+        self.profile_mode = tk.StringVar(value="off")
+        self.profile_combobox = ttk.Combobox(root, textvariable=self.profile_mode, values=["off", "cprofile", "sampling"],
+                                             state="readonly", width=10)
+        self.profile_combobox.pack(pady=5)
+
         # Submit button
         self.submit_button = tk.Button(root, text="Submit", command=self.process_excel)
         self.submit_button.pack(pady=20)
@@ -86,35 +109,19 @@ class ExcelProcessorApp:
         self.logger_frame = Logger(root)
         self.logger_frame.pack(pady=10)
 
-        # Configure logger
-        self.logger = logging.getLogger('ExcelProcessor')
-        self.logger.setLevel(logging.DEBUG)
-
-        # Create a file handler and set its level to DEBUG
-        file_handler = logging.FileHandler('logs.log')
-        file_handler.setLevel(logging.DEBUG)
-
-        # Create a logging format
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-
-        # Set the formatter for the handler
-        file_handler.setFormatter(formatter)
-
-        # Add the file handler to the logger
-        self.logger.addHandler(file_handler)
-
-        # Create a custom handler for displaying logs in the UI
-        ui_handler = TextHandler(self.logger_frame)
-        ui_handler.setLevel(logging.DEBUG)
-        ui_handler.setFormatter(formatter)
-        self.logger.addHandler(ui_handler)
+        # Configure logger: records are queued and written to logs.log and the UI buffer by a
+        # listener thread; the Text widget is only touched from process_queue
+        self.log_buffer = RingBufferHandler(capacity=Logger.MAX_LINES)
+        self.log_buffer.setLevel(logging.INFO)
+        self.log_pipeline = start_logging('ExcelProcessor', 'logs.log', handlers=[self.log_buffer])
+        self.logger = self.log_pipeline.logger
 
         # Task queue
         self.task_queue = queue.Queue()
         self.root.after(100, self.process_queue)
 
     def browse_source_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx *.xls")])
+        file_path = filedialog.askopenfilename(filetypes=[("Source files", "*.xlsx *.xlsm *.csv *.parquet")])
         if file_path:
             self.source_entry.delete(0, tk.END)
             self.source_entry.insert(0, file_path)
@@ -128,55 +135,85 @@ class ExcelProcessorApp:
     def process_excel(self):
         source_file = self.source_entry.get()
         dest_file = self.dest_entry.get()
+        try:
+            workers = int(self.workers_spinbox.get())
+        except ValueError:
+            messagebox.showerror("Error", "Parallel workers must be a number")
+            return
 
         if not source_file or not dest_file:
             messagebox.showerror("Error", "Please select both source and destination files")
             return
 
-        threading.Thread(target=self.process_excel_thread, args=(source_file, dest_file)).start()
+        retry_errors = self.retry_errors.get()
+        profile_mode = None if self.profile_mode.get() == "off" else self.profile_mode.get()
+
+        threading.Thread(
+            target=self.process_excel_thread, args=(source_file, dest_file, workers, retry_errors, profile_mode)
+        ).start()
 
-    def process_excel_thread(self, source_file, dest_file):
+    def process_excel_thread(self, source_file, dest_file, workers=1, retry_errors=True, profile_mode=None):
+        total_rows = 0
         try:
             self.task_queue.put(("submit_button_state", "disabled"))
             self.task_queue.put(("progress", 0))
             self.task_queue.put(("progress_label", "0% (0/0)"))
             self.logger.info(f"Starting Excel processing. Source path: {source_file}. Dest path: {dest_file}")
+            metrics.reset()
+            profiler.configure(profile_mode)
 
             # Read the source Excel file
-            df = pd.read_excel(source_file)
-            total_rows = len(df)
-            self.logger.info(f"Total rows to process: {total_rows}")
-            df.columns = ["FIRST_NAME", "LAST_NAME", "STREET", "CITY", "DIST", "ZIP"]
-
-            for index, row in df.iterrows():
-                df = process_row(row, dest_file, self.logger)
-                def show_try_again_popup():
-                    result = messagebox.askretrycancel("Error", "Updating excel could not be possible. Please close the file if you are viewing")
-                    return result
-
-                while True:
-                    try:
-                        df.to_excel(dest_file, index=False)
-                        break
-                    except:
-                        if not show_try_again_popup():
-                            continue
-                progress_percentage = (index + 1) / total_rows * 100
-                self.task_queue.put(("progress", progress_percentage))
-                self.task_queue.put(("progress_label", f"{progress_percentage:.2f}% ({index + 1}/{total_rows})"))
+            source = read_source(source_file)
 
+            def on_progress(finished, total):
+                nonlocal total_rows
+                total_rows = total
+                progress_percentage = finished / total_rows * 100 if total_rows else 100
+                self.task_queue.put(("progress", progress_percentage))
+                self.task_queue.put(("progress_label", f"{progress_percentage:.2f}% ({finished}/{total_rows})"))
+
+            sink = run_batch(source, dest_file, self.logger, workers, retry_errors, on_progress)
+
+            def show_try_again_popup():
+                result = messagebox.askretrycancel("Error", "Updating excel could not be possible. Please close the file if you are viewing")
+                return result
+
+            while True:
+                try:
+                    sink.export_excel(dest_file)
+                    break
+                except:
+                    if not show_try_again_popup():
+                        continue
+            self.logger.info(f"Saved to excel: {dest_file}")
+
+            stats = run_stats()
+            self.logger.info(f"Response cache: {stats['response_cache']}")
+            self.logger.info(f"Proxy utilization: {stats['proxy']}")
+            self.logger.info(f"Fetch strategy: {stats['fetch_strategy']}")
+            self.logger.info(f"Coalesced lookups: {stats['coalescing']}")
+            # Stage timings for this run, also kept next to the destination file
+            summary = metrics.summary_lines()
+            for line in summary:
+                self.logger.info(line)
+            metrics.write(f"{os.path.splitext(dest_file)[0]}.metrics.json")
             self.logger.info("Excel processing completed.")
-            self.task_queue.put(("messagebox", ("Info", "Excel processing completed successfully.")))
+            self.task_queue.put(("messagebox", ("Info", f"Excel processing completed successfully.\n{summary[0]}")))
         except Exception as e:
             self.logger.error("Error occurred: %s", str(e))
             self.logger.error(traceback.format_exc())
             self.task_queue.put(("messagebox", ("Error", str(e))))
         finally:
+            profile_path = profiler.finish()
+            if profile_path:
+                self.logger.info(f"Profile written to {profile_path}")
+            driver_pool.close()
             self.task_queue.put(("submit_button_state", "normal"))
             self.task_queue.put(("progress", 100))
             self.task_queue.put(("progress_label", f"100% ({total_rows}/{total_rows})"))
 
     def process_queue(self):
+        self.logger_frame.log_lines(self.log_buffer.drain())
         while not self.task_queue.empty():
             task = self.task_queue.get()
             if task[0] == "submit_button_state":
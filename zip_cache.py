@@ -0,0 +1,68 @@
+import json
+import sqlite3
+import threading
+import time
+
+from address_normalize import zip5
+
+
+class ZipCityCache:
+    """Disk-backed ZIP -> city list cache shared by every worker (and every run) through one SQLite file."""
+
+    def __init__(self, path="zip_cache.sqlite", ttl_sec=30 * 24 * 3600, max_entries=50000) -> None:
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.initialized = False
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self.initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS zip_cities ("
+                "zip TEXT PRIMARY KEY, cities TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS zip_cities_stored_at ON zip_cities (stored_at)")
+            conn.commit()
+            self.initialized = True
+        return conn
+
+    @staticmethod
+    def key(zip):
+        return zip5(zip) or str(zip).strip()
+
+    def get(self, zip):
+        with self.lock:
+            conn = self.connect()
+            try:
+                found = conn.execute(
+                    "SELECT cities, stored_at FROM zip_cities WHERE zip = ?", (self.key(zip),)
+                ).fetchone()
+            finally:
+                conn.close()
+        if found is None:
+            return None
+        cities, stored_at = found
+        if time.time() - stored_at > self.ttl_sec:
+            return None
+        return json.loads(cities)
+
+    def set(self, zip, cities):
+        with self.lock:
+            conn = self.connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO zip_cities (zip, cities, stored_at) VALUES (?, ?, ?)",
+                    (self.key(zip), json.dumps(cities), time.time()),
+                )
+                conn.execute("DELETE FROM zip_cities WHERE stored_at < ?", (time.time() - self.ttl_sec,))
+                conn.execute(
+                    "DELETE FROM zip_cities WHERE zip IN ("
+                    "SELECT zip FROM zip_cities ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                conn.commit()
+            finally:
+                conn.close()
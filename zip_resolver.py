@@ -0,0 +1,116 @@
+import abc
+import bisect
+import csv
+import os
+import threading
+from array import array
+
+from address_normalize import zip5
+
+ZIP_COLUMNS = ("zip", "zipcode", "zip_code", "zip code")
+CITY_COLUMNS = ("city", "primary_city", "city_name")
+STATE_COLUMNS = ("state", "state_id", "state_code", "dist")
+ACCEPTABLE_COLUMNS = ("acceptable_cities", "other_cities")
+# The dataset ships next to the scraper, wherever it is launched from
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zip_cities.csv")
+
+
+def unique_city(city_list):
+    unique_cities = []
+    seen_prefixes = set()
+
+    for city in city_list:
+        prefix = city[:3]
+        if prefix not in seen_prefixes:
+            unique_cities.append(city)
+            seen_prefixes.add(prefix)
+
+    return unique_cities
+
+
+class ZipResolver(abc.ABC):
+    """Resolves a ZIP to the USPS style city list ("CITY ST" entries). Returns None on a miss."""
+
+    @abc.abstractmethod
+    def resolve(self, zip):
+        ...
+
+
+class LocalZipResolver(ZipResolver):
+    """In-memory ZIP index built from a zip/city/state CSV.
+
+    ZIPs are kept in a sorted array next to an offsets array into one flat tuple of city strings,
+    so a lookup is a bisect plus a slice.
+    """
+
+    def __init__(self, dataset_path) -> None:
+        self.dataset_path = dataset_path
+        self.lock = threading.Lock()
+        self.zips = None
+        self.offsets = None
+        self.cities = None
+
+    @staticmethod
+    def pick_column(fieldnames, candidates):
+        lowered = {name.strip().lower(): name for name in fieldnames}
+        for candidate in candidates:
+            if candidate in lowered:
+                return lowered[candidate]
+        return None
+
+    @staticmethod
+    def zip_to_int(zip):
+        zip = zip5(zip)
+        return int(zip) if zip else None
+
+    def load(self):
+        grouped = {}
+        with open(self.dataset_path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            zip_column = self.pick_column(reader.fieldnames, ZIP_COLUMNS)
+            city_column = self.pick_column(reader.fieldnames, CITY_COLUMNS)
+            state_column = self.pick_column(reader.fieldnames, STATE_COLUMNS)
+            acceptable_column = self.pick_column(reader.fieldnames, ACCEPTABLE_COLUMNS)
+            if not (zip_column and city_column and state_column):
+                raise ValueError(f"{self.dataset_path} needs zip, city and state columns, got {reader.fieldnames}")
+            for line in reader:
+                zip = self.zip_to_int(line[zip_column])
+                if zip is None:
+                    continue
+                state = line[state_column].strip().upper()
+                names = [line[city_column]]
+                if acceptable_column and line[acceptable_column]:
+                    names.extend(line[acceptable_column].split(","))
+                cities = grouped.setdefault(zip, [])
+                for name in names:
+                    name = name.strip().upper()
+                    if name:
+                        cities.append(f"{name} {state}")
+
+        zips = array("I")
+        offsets = array("I", [0])
+        flat = []
+        for zip in sorted(grouped):
+            zips.append(zip)
+            flat.extend(unique_city(grouped[zip]))
+            offsets.append(len(flat))
+        self.zips, self.offsets, self.cities = zips, offsets, tuple(flat)
+
+    def resolve(self, zip):
+        if self.zips is None:
+            with self.lock:
+                if self.zips is None:
+                    self.load()
+        key = self.zip_to_int(zip)
+        if key is None:
+            return None
+        index = bisect.bisect_left(self.zips, key)
+        if index == len(self.zips) or self.zips[index] != key:
+            return None
+        return list(self.cities[self.offsets[index]:self.offsets[index + 1]])
+
+
+def default_resolvers(dataset_path=DEFAULT_DATASET):
+    if os.path.exists(dataset_path):
+        return [LocalZipResolver(dataset_path)]
+    return []